@@ -0,0 +1,27 @@
+import os
+import hmac
+from fastapi import HTTPException, Request
+
+# -------------------- CONFIG --------------------
+# Without ADMIN_TOKEN the admin endpoints are closed; ADMIN_OPEN=1 opens them for local development only
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+ADMIN_OPEN = os.environ.get("ADMIN_OPEN", "0") == "1"
+ADMIN_HEADER = "x-admin-token"
+
+def has_token(headers):
+    supplied = headers.get(ADMIN_HEADER)
+    return (ADMIN_TOKEN is not None and supplied is not None
+            and hmac.compare_digest(supplied.encode("utf-8"), ADMIN_TOKEN.encode("utf-8")))
+
+def is_admin(headers):
+    return has_token(headers) or (ADMIN_TOKEN is None and ADMIN_OPEN)
+
+def require_admin(request: Request):
+    """FastAPI dependency guarding the /admin routes."""
+    if not is_admin(request.headers):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+def require_admin_token(request: Request):
+    """Like require_admin, but ADMIN_OPEN doesn't count: for routes that overwrite stored data."""
+    if not has_token(request.headers):
+        raise HTTPException(status_code=403, detail="Admin token required")
@@ -0,0 +1,138 @@
+import os
+import math
+import time
+from urllib.parse import parse_qsl
+from collections import OrderedDict
+
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+
+import districts as district_table
+from metrics import Counter, match_route
+from weekly_cache import cache_version
+
+# -------------------- CONFIG --------------------
+RATE_LIMITING_ENABLED = os.environ.get("RATE_LIMITING", "1") == "1"
+TRUST_PROXY = os.environ.get("TRUST_PROXY", "0") == "1"  # take the client IP from X-Forwarded-For
+MAX_CLIENTS = 10000  # buckets kept per worker; the least recently seen are dropped first
+
+# route class -> (tokens per second, burst) per client IP and worker
+BUDGETS = {
+    "cheap": (20.0, 60),
+    "expensive": (5.0, 20),
+    "scrape": (0.5, 5),
+}
+# route class -> requests handled at once per worker; extra requests get 503
+CONCURRENCY = {
+    "expensive": 8,
+    "scrape": 4,
+}
+
+EXPENSIVE_ROUTES = {"/api/medic", "/advise", "/query-crops/", "/api/crop-summary"}
+SCRAPE_ROUTES = {"/weekly/{district}", "/daily-forecast/{district}", "/forecast/nearest"}
+EXEMPT_PREFIXES = ("/admin", "/metrics", "/ready")
+
+REJECTED = Counter("admission_rejected_total", "Requests shed by admission control", ("route_class", "reason"))
+
+# -------------------- TOKEN BUCKETS --------------------
+class TokenBuckets:
+    def __init__(self, budgets, max_keys=MAX_CLIENTS):
+        self.budgets = budgets
+        self.max_keys = max_keys
+        self.buckets = OrderedDict()  # (client, route class) -> [tokens, last refill]
+
+    def take(self, client, route_class):
+        """Spend one token; returns 0 when allowed, else seconds until a token is available."""
+        rate, burst = self.budgets[route_class]
+        key = (client, route_class)
+        now = time.monotonic()
+        bucket = self.buckets.pop(key, None) or [float(burst), now]
+        bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+        bucket[1] = now
+        self.buckets[key] = bucket
+        if len(self.buckets) > self.max_keys:
+            self.buckets.popitem(last=False)
+
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0.0
+        return (1 - bucket[0]) / rate
+
+# -------------------- MIDDLEWARE --------------------
+def scrape_target(template, params, query_string):
+    """District a scrape route would fetch, found the way main.py finds it; None when it fetches none."""
+    if template == "/forecast/nearest":
+        query = dict(parse_qsl(query_string))
+        try:
+            row, distance = district_table.nearest(float(query["lat"]), float(query["lon"]))
+        except (KeyError, ValueError):
+            return None
+        return row["slug"] if distance <= district_table.MAX_NEAREST_KM else None
+    name = params.get("district", "")
+    return district_table.resolve(name) or name.lower()
+
+def route_class(template, params, query_string=""):
+    if template in SCRAPE_ROUTES:
+        # Cached districts are served from disk, only misses can reach metmalawi
+        district = scrape_target(template, params, query_string)
+        return "cheap" if district is None or cache_version(district) else "scrape"
+    if template in EXPENSIVE_ROUTES:
+        return "expensive"
+    return "cheap"
+
+def client_ip(scope):
+    if TRUST_PROXY:
+        forwarded = Headers(scope=scope).get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+class AdmissionMiddleware:
+    """
+    Per-client token buckets with separate budgets per route class, plus a cap
+    on concurrent expensive/scraping requests. Rejections carry Retry-After
+    instead of queueing without bound.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.buckets = TokenBuckets(BUDGETS)
+        self.in_flight = {name: 0 for name in CONCURRENCY}
+
+    async def __call__(self, scope, receive, send):
+        if not RATE_LIMITING_ENABLED or scope["type"] != "http" or scope["path"].startswith(EXEMPT_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+
+        template, params = match_route(scope)
+        klass = route_class(template, params, scope.get("query_string", b"").decode("latin-1"))
+
+        wait = self.buckets.take(client_ip(scope), klass)
+        if wait:
+            REJECTED.inc(route_class=klass, reason="rate")
+            await self.reject(429, "Too many requests", wait, scope, receive, send)
+            return
+
+        limit = CONCURRENCY.get(klass)
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+        if self.in_flight[klass] >= limit:
+            REJECTED.inc(route_class=klass, reason="concurrency")
+            await self.reject(503, "Server busy, please retry", 1, scope, receive, send)
+            return
+
+        self.in_flight[klass] += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight[klass] -= 1
+
+    async def reject(self, status, message, retry_after, scope, receive, send):
+        response = JSONResponse(
+            {"error": message},
+            status_code=status,
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+        await response(scope, receive, send)
@@ -3,6 +3,7 @@ from datetime import date
 # IMPORT EXISTING FILES
 from seasonforecast import get_season_forecast
 from crop_summary import get_crop_summary
+import cpu_pool
 
 
 def parse_forecast_signals(forecast_text: str):
@@ -66,6 +67,12 @@ def generate_advice(crop_name: str, district: str):
 
     forecast_text = forecast_data["forecast"]
 
+    return cpu_pool.run(compose_advice, crop_name, district, forecast_text, crop_paragraph, today)
+
+
+def compose_advice(crop_name: str, district: str, forecast_text: str, crop_paragraph: str, today: date):
+    """The advice text itself; pure CPU work on already loaded inputs, safe to run in the CPU pool."""
+
     # --- Parse signals ---
     f = parse_forecast_signals(forecast_text)
     c = parse_crop_signals(crop_paragraph)
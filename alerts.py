@@ -0,0 +1,165 @@
+import os
+import json
+import time
+import threading
+from datetime import datetime
+
+import pandas as pd
+
+from interpretation import time_blocks
+from forecast_history import valid_time
+from forecast_store import store
+
+# -------------------- CONFIG --------------------
+ALERTS_FILE = os.environ.get("ALERTS_FILE", "cache/alerts.json")
+REBUILD_DELAY_SECONDS = float(os.environ.get("ALERT_REBUILD_DELAY_SECONDS", "5"))  # debounce for bursts of writes
+
+# Same cut-offs as interpretation.rainfall_description / wind_description
+THRESHOLDS = {
+    "heavy_rain": ("rainfall", 10.0),    # mm summed over a block
+    "strong_wind": ("wind_speed", 15.0), # peak speed within a block
+}
+
+BLOCK_OF_HOUR = {hour: name for name, hours in time_blocks.items() for hour in hours}
+BLOCK_ORDER = {name: i for i, name in enumerate(time_blocks)}
+
+os.makedirs(os.path.dirname(ALERTS_FILE), exist_ok=True)
+
+_memory = {"mtime": None, "index": None}
+_rebuild_lock = threading.Lock()
+_pending = {"timer": None}
+_pending_lock = threading.Lock()
+
+# -------------------- EVALUATION --------------------
+def hourly_frame(forecasts: dict):
+    """One row per district and forecast hour, from {district: cached forecast}."""
+    records = [
+        (district, day.get("date", ""), row.get("Time", ""), row.get("Rainfall", ""), row.get("Wind Speed", ""))
+        for district, data in forecasts.items()
+        for day in data.get("data", [])
+        for row in day.get("rows", [])
+    ]
+    return pd.DataFrame(records, columns=["district", "date", "time", "rainfall", "wind_speed"])
+
+def evaluate(forecasts: dict, today: datetime = None):
+    """
+    Every (district, day, block, alert type) over the thresholds, for all
+    districts in one pass: rainfall is summed and wind speed maxed per block,
+    as the interpretation paragraphs do.
+    """
+    today = today or datetime.now()
+    df = hourly_frame(forecasts)
+    if df.empty:
+        return []
+
+    number = r"(-?\d+(?:\.\d+)?)"
+    df["rainfall"] = pd.to_numeric(df["rainfall"].str.extract(number)[0], errors="coerce").fillna(0.0)
+    df["wind_speed"] = pd.to_numeric(df["wind_speed"].str.extract(number)[0], errors="coerce").fillna(0.0)
+    df["hour"] = pd.to_numeric(df["time"].str.extract(r"^(\d{1,2}):")[0], errors="coerce")
+    df = df.dropna(subset=["hour"])
+    df["block"] = df["hour"].astype(int).map(BLOCK_OF_HOUR)
+
+    blocks = df.groupby(["district", "date", "block"], sort=False).agg(
+        rainfall=("rainfall", "sum"), wind_speed=("wind_speed", "max")
+    ).reset_index()
+
+    # Day labels carry no year; resolve each distinct label once
+    iso = {}
+    for label in blocks["date"].unique():
+        try:
+            iso[label] = valid_time(label, "00:00", today).date().isoformat()
+        except ValueError:
+            iso[label] = None
+    blocks["iso_date"] = blocks["date"].map(iso)
+    blocks = blocks[blocks["iso_date"].notna() & (blocks["iso_date"] >= today.date().isoformat())]
+
+    alerts = []
+    for alert_type, (column, threshold) in THRESHOLDS.items():
+        hits = blocks[blocks[column] > threshold]
+        for row in hits.itertuples(index=False):
+            alerts.append({
+                "district": row.district,
+                "date": row.date,
+                "iso_date": row.iso_date,
+                "block": row.block,
+                "type": alert_type,
+                "value": round(float(getattr(row, column)), 1),
+                "threshold": threshold,
+            })
+    alerts.sort(key=lambda a: (a["iso_date"], a["district"], BLOCK_ORDER[a["block"]], a["type"]))
+    return alerts
+
+# -------------------- INDEX --------------------
+def rebuild():
+    """Evaluate every cached district and publish the index for all workers."""
+    with _rebuild_lock:
+        start = time.perf_counter()
+        forecasts = {}
+        for district in store.districts():
+            stored = store.read(district)
+            if stored is not None:
+                forecasts[district] = json.loads(stored[1])
+        index = {
+            "generated_at": datetime.now().isoformat(timespec="seconds"),
+            "districts_evaluated": len(forecasts),
+            "thresholds": {name: threshold for name, (_, threshold) in THRESHOLDS.items()},
+            "alerts": evaluate(forecasts),
+        }
+
+        tmp = f"{ALERTS_FILE}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(index, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, ALERTS_FILE)
+        print(f"[INFO] Alert index rebuilt: {len(index['alerts'])} alerts across "
+              f"{len(forecasts)} districts in {time.perf_counter() - start:.2f}s")
+        return index
+
+def _run_pending():
+    with _pending_lock:
+        _pending["timer"] = None  # writes from here on schedule the next rebuild
+    try:
+        rebuild()
+    except Exception as e:
+        print(f"[ERROR] Alert index rebuild failed: {e}")
+
+def schedule_rebuild():
+    """Rebuild REBUILD_DELAY_SECONDS after the first of a burst of forecast writes, once."""
+    with _pending_lock:
+        if _pending["timer"] is not None:
+            return
+        timer = threading.Timer(REBUILD_DELAY_SECONDS, _run_pending)
+        timer.daemon = True
+        _pending["timer"] = timer
+        timer.start()
+
+def load_index():
+    """The index written by the refresh leader, re-read only when it changes."""
+    try:
+        mtime = os.stat(ALERTS_FILE).st_mtime_ns
+    except FileNotFoundError:
+        rebuild()
+        mtime = os.stat(ALERTS_FILE).st_mtime_ns
+    if _memory["mtime"] != mtime:
+        with open(ALERTS_FILE, "r", encoding="utf-8") as f:
+            index = json.load(f)
+        by_district = {}
+        for alert in index["alerts"]:
+            by_district.setdefault(alert["district"], []).append(alert)
+        index["by_district"] = by_district
+        _memory.update(mtime=mtime, index=index)
+    return _memory["index"]
+
+def query(district: str = None, alert_type: str = None, on: str = None):
+    index = load_index()
+    alerts = index["by_district"].get(district.lower(), []) if district else index["alerts"]
+    if alert_type:
+        alerts = [a for a in alerts if a["type"] == alert_type]
+    if on:
+        alerts = [a for a in alerts if a["iso_date"] == on]
+    return {
+        "generated_at": index["generated_at"],
+        "districts_evaluated": index["districts_evaluated"],
+        "thresholds": index["thresholds"],
+        "count": len(alerts),
+        "alerts": alerts,
+    }
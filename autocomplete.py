@@ -0,0 +1,207 @@
+import re
+import heapq
+import bisect
+
+import reloader
+import read_ecocrop
+import medic
+
+# -------------------- CONFIG --------------------
+MAX_LIMIT = 50
+MAX_DISTANCE = 2
+SOURCES = ("ecocrop", "pfaf")
+SOURCE_SETS = (SOURCES, ("ecocrop",), ("pfaf",))
+TOP_RANGE = 200        # prefixes matching more names than this are ranked once, when the index is built
+TOP_PREFIX_LENGTH = 3
+
+def normalize(name: str):
+    return re.sub(r"\s+", " ", str(name).strip().lower())
+
+# -------------------- INDEX --------------------
+class NameIndex:
+    """
+    Crop and plant names in one sorted array. A prefix is a contiguous slice
+    found with two bisections; the sorted order doubles as an implicit trie
+    for the typo-tolerant search. Matches are ranked the typed name itself
+    first, then common names before scientific ones, a crop's main name
+    before its local aliases, then the shortest, so "ma" suggests maize
+    rather than mak or maco.
+    """
+
+    def __init__(self, entries, primary=()):
+        # entries: (key, name, source, kind); one per distinct (key, source, kind)
+        # primary: keys that are a crop's or plant's main name rather than an alias
+        entries = sorted(set(entries))
+        primary = set(primary)
+        self.keys = [e[0] for e in entries]
+        self.entries = entries
+        self.rank = [(e[3] != "common", e[0] not in primary, len(e[0]), i) for i, e in enumerate(entries)]
+        # Prefixes matching more than TOP_RANGE names get their best MAX_LIMIT precomputed
+        self.top = {}  # (prefix, sources) -> positions, best first
+        for length in range(1, TOP_PREFIX_LENGTH + 1):
+            i = 0
+            while i < len(entries):
+                prefix = self.keys[i][:length]
+                lo, hi = self.prefix_range(prefix)
+                if hi - lo > TOP_RANGE:
+                    for sources in SOURCE_SETS:
+                        self.top[prefix, sources] = self.best(range(lo, hi), sources, MAX_LIMIT)
+                i = hi
+
+    def __len__(self):
+        return len(self.entries)
+
+    def prefix_range(self, prefix: str):
+        lo = bisect.bisect_left(self.keys, prefix)
+        hi = bisect.bisect_left(self.keys, prefix + "\U0010ffff", lo)
+        return lo, hi
+
+    def best(self, positions, sources, limit):
+        return heapq.nsmallest(
+            limit, (i for i in positions if self.entries[i][2] in sources), key=self.rank.__getitem__
+        )
+
+    def complete(self, prefix: str, sources, limit: int):
+        lo, hi = self.prefix_range(prefix)
+        exact = []
+        while lo < hi and self.keys[lo] == prefix:  # the typed name itself leads
+            if self.entries[lo][2] in sources:
+                exact.append(lo)
+            lo += 1
+        ranked = self.top.get((prefix, sources))
+        if ranked is None:
+            ranked = self.best(range(lo, hi), sources, limit)
+        return [(0, i) for i in exact + [i for i in ranked if i not in exact]][:limit]
+
+    def fuzzy(self, query: str, max_distance: int, sources, limit: int):
+        """
+        (distance, position) of names with a prefix within 1..max_distance
+        edits of query. Only names sharing the query's first letter are
+        walked; a typo there is rare and scanning every name costs ten times
+        as much. Keys are walked in order, reusing the Levenshtein rows of
+        the prefix shared with the previous key, and every key under a
+        prefix that can no longer match, or that is already max_distance
+        longer than the query, is settled with one bisection. Once limit
+        names are found within some distance, farther ones are no longer
+        looked for, and the walk ends when that distance is 1.
+        """
+        keys = self.keys
+        width = len(query) + 1
+        max_depth = len(query) + max_distance  # deeper prefixes cannot get closer to query
+        rows = [list(range(width))]  # rows[d]: distances of query prefixes to key[:d]
+        best = [rows[0][-1]]         # best[d]: closest match of query to any key[:i], i <= d
+        path = ""
+        hits = []
+        found = [0] * (max_distance + 1)  # found[d]: hits at distance d
+        i, end = self.prefix_range(query[0])
+        while i < end and max_distance > 0:
+            key = keys[i]
+            stop = min(len(key), max_depth)
+            shared = 0
+            common = min(len(path), stop)
+            while shared < common and path[shared] == key[shared]:
+                shared += 1
+            del rows[shared + 1:], best[shared + 1:]
+            path = key[:stop]
+
+            dead = None
+            for depth in range(shared, stop):
+                # Only cells within max_distance of the diagonal can stay in range; the rest
+                # and anything larger are kept at cap, which is all the comparisons below need
+                cap = max_distance + 1
+                prev = rows[-1]
+                row = [cap] * width
+                row[0] = lowest = min(prev[0] + 1, cap)
+                char = key[depth]
+                for j in range(max(1, depth + 1 - max_distance), min(width, depth + 2 + max_distance)):
+                    value = prev[j - 1] + (query[j - 1] != char)
+                    if row[j - 1] + 1 < value:
+                        value = row[j - 1] + 1
+                    if prev[j] + 1 < value:
+                        value = prev[j] + 1
+                    row[j] = value if value < cap else cap
+                    if value < lowest:
+                        lowest = value
+                rows.append(row)
+                best.append(min(best[-1], row[-1]))
+                if best[-1] > max_distance and lowest > max_distance:
+                    dead = depth + 1
+                    break
+
+            if dead is not None:
+                # Nothing starting with key[:dead] can come back within range
+                _, i = self.prefix_range(key[:dead])
+                path = key[:dead - 1]
+                del rows[dead:], best[dead:]
+                continue
+            # Past max_depth every key under the prefix is as close as the prefix itself
+            following = self.prefix_range(path)[1] if stop < len(key) else i + 1
+            # Distance 0 means the key starts with query: complete() already has those
+            distance = best[stop]
+            if 0 < distance <= max_distance:
+                matched = [(distance, k) for k in range(i, following) if self.entries[k][2] in sources]
+                hits += matched
+                # A settled prefix counts once, so one large family of names can't end the walk
+                found[distance] += 1 if matched else 0
+                # Enough hits closer than max_distance (or at 1, where none can be closer) tighten the search
+                while max_distance > 0 and sum(found[1:max(max_distance, 2)]) >= limit:
+                    max_distance -= 1
+            i = following
+        return hits
+
+    def search(self, query: str, limit: int = 10, max_distance: int = 0, sources=SOURCES):
+        query = normalize(query)
+        if not query:
+            return []
+        sources = tuple(s for s in SOURCES if s in sources)
+        hits = self.complete(query, sources, limit)
+        if max_distance and len(hits) < limit:
+            # Closest first, then by the same rank as prefix matches
+            extra = self.fuzzy(query, max_distance, sources, limit - len(hits))
+            hits += heapq.nsmallest(limit - len(hits), extra, key=lambda h: (h[0], self.rank[h[1]]))
+        return [
+            {"name": self.entries[i][1], "source": self.entries[i][2], "kind": self.entries[i][3], "distance": d}
+            for d, i in hits
+        ]
+
+def _split_names(value, separators=r"[,;]"):
+    return [n for n in (normalize(p) for p in re.split(separators, str(value or ""))) if n]
+
+def build_index():
+    """Names from the EcoCrop table (COMNAME aliases, scientific names) and PFAF."""
+    entries, primary = [], set()
+
+    name_index = read_ecocrop.load_name_index()
+    if name_index is not None:
+        entries += [(name, name, "ecocrop", "common") for name in name_index["name"]]
+    df = read_ecocrop.load_ecocrop_data()
+    if df is not None:
+        for scientific in df["ScientificName"].dropna().astype(str):
+            entries.append((normalize(scientific), scientific.strip(), "ecocrop", "scientific"))
+        for row in df[["CommonEnglishName", "WidelyKnownAs"]].to_dict("records"):
+            primary.update(normalize(read_ecocrop.safe_str(row[c])) for c in row)
+
+    plants = medic.load_plants()
+    for common in plants["Common Name"]:
+        names = _split_names(common)
+        entries += [(n, n, "pfaf", "common") for n in names]
+        primary.update(names)
+    for aliases in plants["Common Names"]:
+        entries += [(n, n, "pfaf", "common") for n in _split_names(aliases)]
+    for scientific in plants["Scientific Name"]:
+        if scientific.strip():
+            entries.append((normalize(scientific), scientific.strip(), "pfaf", "scientific"))
+
+    index = NameIndex(entries, primary)
+    print(f"[INFO] Autocomplete index built: {len(index)} names")
+    return index
+
+# Rebuilt with the tables it is made from
+names = reloader.register("autocomplete", [read_ecocrop.DATA_FILE, medic.DATA_FILE], build_index)
+
+def autocomplete(query: str, limit: int = 10, max_distance: int = 0, source: str = None):
+    sources = (source,) if source else SOURCES
+    return {
+        "query": query,
+        "results": names.get().search(query, limit, max_distance, sources),
+    }
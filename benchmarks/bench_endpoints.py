@@ -0,0 +1,222 @@
+"""
+Endpoint benchmark for main.py, run in-process and fully offline.
+
+    python benchmarks/bench_endpoints.py
+    python benchmarks/bench_endpoints.py --save benchmarks/baseline.json
+    python benchmarks/bench_endpoints.py --compare benchmarks/baseline.json
+    python benchmarks/bench_endpoints.py --only medic-broad,advise --cpu-pool 4 --compare inline.json
+    RESPONSE_CACHE=0 python benchmarks/bench_endpoints.py   # handlers only, no cached responses
+
+metmalawi is replaced by generated HTML, Supabase by an in-memory fake and, if
+data/pfaf_plants_merged_clean.csv is missing, PFAF by a synthetic table (see
+stubs.py). Forecast caches go to a temp directory, so the real cache/ is left
+alone. Needs httpx, the same dependency FastAPI's TestClient uses.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import tempfile
+import subprocess
+from pathlib import Path
+from datetime import datetime
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import stubs
+
+DISTRICTS = ["balaka", "kasungu", "lilongwe", "mzuzu", "rumphi", "thyolo", "zomba"]
+CROPS = ["okra", "maize", "cassava", "sorghum", "groundnut"]
+
+def weekly_miss(i):
+    """A bundled district outside DISTRICTS, evicted first so the request has to scrape it."""
+    import districts
+    from forecast_store import store
+    uncached = [row["slug"] for row in districts.table.get()["rows"] if row["slug"] not in DISTRICTS]
+    district = uncached[i % len(uncached)]
+    store.delete(district)
+    return f"/weekly/{district}"
+
+SCENARIOS = {
+    "weekly": lambda i: f"/weekly/{DISTRICTS[i % len(DISTRICTS)]}",
+    "weekly-batch": lambda i: "/weekly?districts=all",
+    "weekly-miss": weekly_miss,
+    "daily-forecast": lambda i: f"/daily-forecast/{DISTRICTS[i % len(DISTRICTS)]}",
+    "query-crops": lambda i: "/query-crops/?fertility=high&drainage=well&texture=medium",
+    "medic-plant": lambda i: "/api/medic?query=moringa",
+    "medic-illness": lambda i: "/api/medic?query=tonic&search_type=illness",
+    "medic-broad": lambda i: "/api/medic?query=a",
+    "crop-summary": lambda i: f"/api/crop-summary?name={CROPS[i % len(CROPS)]}",
+    "season-forecast": lambda i: "/api/season-forecast?district=zomba",
+    "advise": lambda i: f"/advise?crop={CROPS[i % len(CROPS)]}&district=zomba",
+    "posts": lambda i: "/posts",
+}
+
+# -------------------- SETUP --------------------
+def build_app(workdir: Path):
+    """Import main with every outside dependency swapped for a local stand-in."""
+    os.chdir(ROOT)
+    os.environ.setdefault("SHARED_DATA_DIR", str(workdir / "shared"))
+    os.environ.setdefault("RATE_LIMITING", "0")  # every bench client shares one address
+    if "PFAF_DATA_FILE" not in os.environ and not (ROOT / "data" / "pfaf_plants_merged_clean.csv").exists():
+        stubs.write_pfaf_csv(workdir / "pfaf.csv")
+        os.environ["PFAF_DATA_FILE"] = str(workdir / "pfaf.csv")
+
+    sys.modules["supabase_client"] = stubs.fake_supabase_module()
+
+    import requests
+    requests.get = stubs.stub_requests_get
+
+    # Everything a run writes stays in workdir, never in the repository's cache/
+    os.environ["FORECAST_DB"] = str(workdir / "forecasts.sqlite3")
+    os.environ["FORECAST_CACHE_DIR"] = str(workdir / "weekly_cache")
+    os.environ["FORECAST_HISTORY_DB"] = str(workdir / "forecast_history.sqlite3")
+    os.environ["FORECAST_DELTA_DIR"] = str(workdir / "deltas")
+    os.environ["ALERTS_FILE"] = str(workdir / "alerts.json")
+
+    import weekly_cache
+    import daily_cache
+    import refresh_scheduler
+    (workdir / "demand").mkdir(exist_ok=True)
+    for module in (weekly_cache, daily_cache):
+        module.DISTRICTS_FILE = str(workdir / "districts.json")
+    refresh_scheduler.DEMAND_DIR = str(workdir / "demand")
+
+    import main
+    for district in DISTRICTS:
+        weekly_cache.fetch_weekly_forecast(district)
+    return main.app
+
+# -------------------- RUNNER --------------------
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+async def run_scenario(client, make_path, requests, concurrency, offset=0):
+    latencies = []
+    errors = 0
+    counter = iter(range(offset, offset + requests))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            path = make_path(i)  # outside the timing: weekly-miss evicts its district here
+            start = time.perf_counter()
+            response = await client.get(path)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "throughput_rps": round(requests / elapsed, 1) if elapsed else 0.0,
+    }
+
+async def run_all(app, names, requests, concurrency, warmup):
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    results = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name in names:
+            make_path = SCENARIOS[name]
+            if warmup:
+                # Measured requests start from fresh indexes, not the ones warmup used
+                await run_scenario(client, make_path, warmup, min(concurrency, warmup), offset=10**6)
+            results[name] = await run_scenario(client, make_path, requests, concurrency)
+            r = results[name]
+            print(f"{name:<16} p50 {r['p50_ms']:>9.2f} ms  p95 {r['p95_ms']:>9.2f} ms  "
+                  f"p99 {r['p99_ms']:>9.2f} ms  {r['throughput_rps']:>8.1f} req/s  errors {r['errors']}")
+    return results
+
+# -------------------- BASELINES --------------------
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(results, baseline, tolerance):
+    """Print the change against a saved run; return the scenarios that regressed."""
+    regressions = []
+    print(f"\nAgainst baseline from {baseline['meta'].get('date')} ({baseline['meta'].get('commit')}):")
+    for name, r in results.items():
+        base = baseline["results"].get(name)
+        if not base:
+            continue
+        p95_change = (r["p95_ms"] - base["p95_ms"]) / base["p95_ms"] if base["p95_ms"] else 0.0
+        rps_change = (r["throughput_rps"] - base["throughput_rps"]) / base["throughput_rps"] if base["throughput_rps"] else 0.0
+        regressed = p95_change > tolerance or rps_change < -tolerance
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<16} p95 {p95_change:+7.1%}  throughput {rps_change:+7.1%}{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100, help="measured requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent clients")
+    parser.add_argument("--warmup", type=int, default=20, help="unmeasured requests per scenario")
+    parser.add_argument("--only", default="", help="comma separated scenario names")
+    parser.add_argument("--save", help="write results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p95/throughput change")
+    parser.add_argument("--cpu-pool", type=int, default=0, help="CPU pool processes for text generation (0 = inline)")
+    args = parser.parse_args()
+
+    names = [n.strip() for n in args.only.split(",") if n.strip()] or list(SCENARIOS)
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+
+    os.environ["CPU_POOL_WORKERS"] = str(args.cpu_pool)
+    os.environ.setdefault("CPU_POOL_MAX_QUEUE", "100000")  # measure throughput, not shedding
+
+    with tempfile.TemporaryDirectory(prefix="bench-") as tmp:
+        app = build_app(Path(tmp))
+        results = asyncio.run(run_all(app, names, args.requests, args.concurrency, args.warmup))
+        import cpu_pool
+        cpu_pool.shutdown()
+
+    report = {
+        "meta": {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "cpu_pool": args.cpu_pool,
+        },
+        "results": results,
+    }
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved results to {args.save}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Offline stand-ins used by the benchmark suite: metmalawi HTML, a fake
+Supabase client and a synthetic PFAF table when the real one isn't present.
+"""
+import csv
+import random
+import types
+from datetime import datetime
+from uuid import uuid4
+
+# -------------------- METMALAWI --------------------
+HEADERS = ["Time", "Weather", "Max Temp", "Min Temp", "Rainfall", "Wind Speed", "Wind Direction"]
+
+def metmalawi_html(district: str, days: int = 7, seed: int = 0):
+    """Daily-table page shaped like metmalawi's: one <table> per day, 24 hourly rows."""
+    rnd = random.Random(f"{district}:{seed}")
+    tables = []
+    for _ in range(days):
+        rows = ["<tr>" + "".join(f"<th>{h}</th>" for h in HEADERS) + "</tr>"]
+        for hour in range(24):
+            t_max = rnd.uniform(15, 33)
+            cells = [
+                f"{hour:02d}:00", "",
+                f"{t_max:.1f} °C", f"{t_max - rnd.uniform(0, 2):.1f} °C",
+                f"{max(0.0, rnd.gauss(0.5, 2)):.1f} mm",
+                f"{rnd.uniform(0, 20):.1f}", f"{rnd.uniform(0, 360):.1f}",
+            ]
+            rows.append("<tr>" + "".join(f"<td>{c}</td>" for c in cells) + "</tr>")
+        tables.append("<table>" + "".join(rows) + "</table>")
+    return "<html><body>" + "".join(tables) + "</body></html>"
+
+class StubResponse:
+    def __init__(self, text, status_code=200):
+        self.text = text
+        self.status_code = status_code
+
+def stub_requests_get(url, timeout=None, **kwargs):
+    """Drop-in for requests.get against metmalawi's daily-table pages."""
+    district = url.rstrip("/").split("/")[-1]
+    return StubResponse(metmalawi_html(district))
+
+# -------------------- SUPABASE --------------------
+class _Result:
+    def __init__(self, data):
+        self.data = data
+
+class _Query:
+    def __init__(self, store, table):
+        self.store = store
+        self.table = table
+        self.filters = []
+        self.order_by = None
+        self.single_row = False
+        self.action = "select"
+        self.payload = None
+
+    def select(self, *columns):
+        return self
+
+    def insert(self, row):
+        self.action, self.payload = "insert", row
+        return self
+
+    def delete(self):
+        self.action = "delete"
+        return self
+
+    def eq(self, column, value):
+        self.filters.append((column, value))
+        return self
+
+    def order(self, column, desc=False):
+        self.order_by = (column, desc)
+        return self
+
+    def single(self):
+        self.single_row = True
+        return self
+
+    def execute(self):
+        rows = self.store.setdefault(self.table, [])
+        if self.action == "insert":
+            row = {"id": str(uuid4()), **self.payload}
+            rows.append(row)
+            return _Result([row])
+
+        matched = [r for r in rows if all(str(r.get(c)) == str(v) for c, v in self.filters)]
+        if self.action == "delete":
+            self.store[self.table] = [r for r in rows if r not in matched]
+            return _Result(matched)
+
+        if self.order_by:
+            column, desc = self.order_by
+            matched = sorted(matched, key=lambda r: r.get(column) or "", reverse=desc)
+        if self.single_row:
+            return _Result(matched[0] if matched else None)
+        return _Result(matched)
+
+class _Bucket:
+    def upload(self, path, data, options=None):
+        return {"Key": path}
+
+    def get_public_url(self, path):
+        return {"publicUrl": f"https://example.invalid/{path}"}
+
+class FakeSupabase:
+    def __init__(self, posts: int = 200):
+        self.store = {"community_posts": [
+            {
+                "id": str(uuid4()),
+                "title": f"Post {i}",
+                "content": "Maize is doing well after the rains. " * 5,
+                "category": "crops",
+                "district": "Zomba",
+                "image_url": None,
+                "published": True,
+                "created_at": datetime(2026, 1, 1 + i % 28).isoformat(),
+            }
+            for i in range(posts)
+        ]}
+        self.storage = types.SimpleNamespace(from_=lambda bucket: _Bucket())
+
+    def table(self, name):
+        return _Query(self.store, name)
+
+def fake_supabase_module():
+    """Module object to install as sys.modules['supabase_client']."""
+    module = types.ModuleType("supabase_client")
+    module.supabase = FakeSupabase()
+    return module
+
+# -------------------- PFAF --------------------
+PFAF_COLUMNS = [
+    "Common Name", "Common Names", "Scientific Name", "Edibility Rating", "Medicinal Rating",
+    "Edible Uses", "Medicinal Properties", "Other Uses", "Care Requirements", "Propagation", "plant_url",
+]
+PROPERTIES = ["stomachic", "carminative", "antibacterial", "antifungal", "febrifuge",
+              "diuretic", "laxative", "astringent", "expectorant", "tonic"]
+
+def write_pfaf_csv(path, rows: int = 8000, seed: int = 0):
+    """Synthetic PFAF table with the columns medic.py reads."""
+    rnd = random.Random(seed)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(PFAF_COLUMNS)
+        for i in range(rows):
+            name = "Moringa" if i % 97 == 0 else f"Plant {i}"
+            writer.writerow([
+                name, f"{name.lower()} tree; herb {i % 13}", f"Genus{i % 400} species{i}",
+                rnd.randint(0, 5), rnd.randint(0, 5),
+                f"Edible Parts: Leaves; Seeds [{i}] Edible Uses: Cooked as a vegetable. 1. Used in tea [2].",
+                "; ".join(rnd.sample(PROPERTIES, 3)),
+                "Dye; Fibre; Wood [3]", "Full sun; Well drained soil", "Seed - sow in spring [4].",
+                f"https://pfaf.org/user/Plant.aspx?id={i}",
+            ])
@@ -0,0 +1,99 @@
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from metrics import Counter, Gauge
+
+# -------------------- CONFIG --------------------
+CPU_POOL_WORKERS = int(os.environ.get("CPU_POOL_WORKERS", "0"))        # 0 runs generators inline
+CPU_POOL_BATCH_SIZE = int(os.environ.get("CPU_POOL_BATCH_SIZE", "250"))  # minimum items per task for batched work
+CPU_POOL_MAX_QUEUE = int(os.environ.get("CPU_POOL_MAX_QUEUE", "64"))     # tasks queued or running, per server worker
+CPU_POOL_START_METHOD = os.environ.get("CPU_POOL_START_METHOD", "forkserver")  # fork is unsafe in a threaded server
+
+POOL_PENDING = Gauge("cpu_pool_pending_tasks", "Tasks queued or running in the CPU pool")
+POOL_REJECTED = Counter("cpu_pool_rejected_total", "Work refused because the CPU pool queue was full")
+
+class PoolBusy(Exception):
+    """The CPU pool queue is full; the request should be retried later."""
+
+_pool = None
+_pending = 0
+_lock = threading.Lock()
+
+# -------------------- POOL --------------------
+def enabled():
+    return CPU_POOL_WORKERS > 0
+
+def get_pool():
+    global _pool
+    with _lock:
+        if _pool is None:
+            context = multiprocessing.get_context(CPU_POOL_START_METHOD)
+            _pool = ProcessPoolExecutor(max_workers=CPU_POOL_WORKERS, mp_context=context)
+            print(f"[INFO] CPU pool started with {CPU_POOL_WORKERS} process(es)")
+        return _pool
+
+def shutdown():
+    global _pool
+    with _lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def _reserve(count):
+    global _pending
+    with _lock:
+        if _pending + count > CPU_POOL_MAX_QUEUE:
+            POOL_REJECTED.inc()
+            raise PoolBusy(f"CPU pool queue is full ({_pending} tasks pending)")
+        _pending += count
+    POOL_PENDING.inc(count)
+
+def _release(count):
+    global _pending
+    with _lock:
+        _pending -= count
+    POOL_PENDING.dec(count)
+
+def _apply(fn, items, args):
+    return [fn(item, *args) for item in items]
+
+def _gather(calls):
+    """Run (fn, args) calls in the pool and return their results in order."""
+    _reserve(len(calls))
+    try:
+        futures = [get_pool().submit(fn, *args) for fn, args in calls]
+        return [future.result() for future in futures]
+    except BrokenProcessPool as e:
+        # A worker died (OOM, segfault); start a fresh pool next time and finish inline
+        print(f"[ERROR] CPU pool broke, running inline: {e}")
+        shutdown()
+        return [fn(*args) for fn, args in calls]
+    finally:
+        _release(len(calls))
+
+# -------------------- PUBLIC API --------------------
+def run(fn, *args):
+    """fn(*args) in a pool process, or inline when the pool is disabled. fn must be importable."""
+    if not enabled():
+        return fn(*args)
+    return _gather([(fn, args)])[0]
+
+def map_batched(fn, items, *args):
+    """
+    [fn(item, *args) for item in items], split into batches so one broad query
+    spreads over every pool process instead of holding the GIL. Batches grow
+    past CPU_POOL_BATCH_SIZE so a single call never queues more than two tasks
+    per pool process.
+    """
+    items = list(items)
+    if not enabled() or len(items) <= 1:
+        return _apply(fn, items, args)
+    size = max(CPU_POOL_BATCH_SIZE, -(-len(items) // (2 * CPU_POOL_WORKERS)))
+    batches = [items[i:i + size] for i in range(0, len(items), size)]
+    results = []
+    for batch in _gather([(_apply, (fn, batch, args)) for batch in batches]):
+        results.extend(batch)
+    return results
@@ -0,0 +1,175 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+import reloader
+import read_ecocrop
+from read_ecocrop import crop_display_name, load_crop_groups
+
+# -------------------- CONFIG --------------------
+MAX_RESULTS = 500
+
+# query name -> EcoCrop column holding a comma separated list of values
+FACETS = {
+    "life_span": "LISPA",
+    "category": "CAT",
+    "climate_zone": "CLIZ",
+    "photoperiod": "PHOTO",
+    "salinity": "SAL",
+    "depth": "DEP",
+    "life_form": "LIFO",
+    "habit": "HABI",
+    "texture": "TEXT",
+    "fertility": "FER",
+    "drainage": "DRA",
+}
+
+# query name -> numeric EcoCrop column
+NUMERIC = {
+    "temp_opt_min": "TOPMN", "temp_opt_max": "TOPMX", "temp_min": "TMIN", "temp_max": "TMAX",
+    "rain_opt_min": "ROPMN", "rain_opt_max": "ROPMX", "rain_min": "RMIN", "rain_max": "RMAX",
+    "ph_opt_min": "PHOPMN", "ph_opt_max": "PHOPMX", "ph_min": "PHMIN", "ph_max": "PHMAX",
+    "cycle_min": "GMIN", "cycle_max": "GMAX",
+}
+
+# site condition -> (lower, upper) columns of the range it has to fall in, tolerated and optimal
+SITE_RANGES = {
+    "temperature": {"tolerated": ("temp_min", "temp_max"), "optimal": ("temp_opt_min", "temp_opt_max")},
+    "rainfall": {"tolerated": ("rain_min", "rain_max"), "optimal": ("rain_opt_min", "rain_opt_max")},
+    "ph": {"tolerated": ("ph_min", "ph_max"), "optimal": ("ph_opt_min", "ph_opt_max")},
+}
+
+def split_values(value):
+    """'poorly (saturated >50% of year), well (dry spells)' -> both values; commas inside brackets stay."""
+    if not isinstance(value, str):
+        return []
+    return [v.strip() for v in re.split(r",\s*(?![^()]*\))", value) if v.strip()]
+
+# -------------------- INDEX --------------------
+class FacetIndex:
+    """
+    Per-attribute indexes over the EcoCrop table, built once per dataset
+    version: a boolean row matrix per categorical facet (one row per value)
+    and a sorted order per numeric column. A query is a few vectorized ANDs,
+    and facet counts are one matrix product per facet.
+    """
+
+    def __init__(self, df, crop_groups):
+        self.size = len(df)
+
+        self.names, self.scientific, self.groups = [], [], []
+        for row in df[["CommonEnglishName", "WidelyKnownAs", "ScientificName"]].to_dict("records"):
+            names = crop_display_name(row) or ("", "")
+            self.names.append(names[0])
+            self.scientific.append(str(row.get("ScientificName") or ""))
+            self.groups.append(crop_groups.get(names[1], "UNCLASSIFIED"))
+        self.named = np.array([bool(n) for n in self.names])
+
+        self.facets = {}  # name -> (values, bool matrix values x rows)
+        for name, column in {**FACETS, "group": None}.items():
+            lists = [[g] for g in self.groups] if column is None else [split_values(v) for v in df[column].tolist()]
+            values = sorted({v for vs in lists for v in vs})
+            position = {v: i for i, v in enumerate(values)}
+            matrix = np.zeros((len(values), self.size), dtype=bool)
+            for row, vs in enumerate(lists):
+                for v in vs:
+                    matrix[position[v], row] = True
+            self.facets[name] = (values, matrix)
+
+        self.numeric = {}  # name -> (values sorted ascending, row of each, NaNs dropped)
+        for name, column in NUMERIC.items():
+            values = pd.to_numeric(df[column], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+            rows = np.flatnonzero(~np.isnan(values))
+            order = rows[np.argsort(values[rows], kind="stable")]
+            self.numeric[name] = (values[order], order)
+
+    def facet_mask(self, name, selected):
+        """Rows having any of the selected values of one facet."""
+        values, matrix = self.facets[name]
+        position = {v.lower(): i for i, v in enumerate(values)}
+        unknown = [v for v in selected if v.lower() not in position]
+        if unknown:
+            raise ValueError(f"Unknown {name} value(s): {', '.join(unknown)}")
+        return matrix[[position[v.lower()] for v in selected]].any(axis=0)
+
+    def range_mask(self, name, low=None, high=None):
+        """Rows whose value lies in [low, high]; rows without a value never match."""
+        values, order = self.numeric[name]
+        start = 0 if low is None else np.searchsorted(values, low, side="left")
+        stop = len(values) if high is None else np.searchsorted(values, high, side="right")
+        mask = np.zeros(self.size, dtype=bool)
+        mask[order[start:stop]] = True
+        return mask
+
+    def query(self, facets: dict, ranges: list, limit: int = 100):
+        """
+        facets: {facet: [values]}, any value matches within a facet and all
+        facets must match. ranges: [(numeric name, low, high)]. Facet counts
+        for each attribute leave out that attribute's own selection, so they
+        show what picking another value would return.
+        """
+        base = self.named.copy()
+        for name, low, high in ranges:
+            base &= self.range_mask(name, low, high)
+        selected = {name: self.facet_mask(name, values) for name, values in facets.items() if values}
+
+        match = base.copy()
+        for mask in selected.values():
+            match &= mask
+
+        counts = {}
+        for name, (values, matrix) in self.facets.items():
+            others = base.copy()
+            for other, mask in selected.items():
+                if other != name:
+                    others &= mask
+            hits = matrix @ others.astype(np.int32)
+            counts[name] = {values[i]: int(hits[i]) for i in np.flatnonzero(hits)}
+
+        rows = np.flatnonzero(match)
+        order = sorted(rows.tolist(), key=lambda r: self.names[r].lower())[:limit]
+        return {
+            "total": int(len(rows)),
+            "count": len(order),
+            "results": [
+                {"name": self.names[r], "scientific_name": self.scientific[r], "group": self.groups[r]}
+                for r in order
+            ],
+            "facets": counts,
+        }
+
+def build_index():
+    df = read_ecocrop.load_ecocrop_data()
+    if df is None:
+        raise ValueError("EcoCrop table could not be read")
+    return FacetIndex(df, load_crop_groups())
+
+# Rebuilt with the EcoCrop table and groups.txt
+facet_index = reloader.register("crop-facets", [read_ecocrop.DATA_FILE, read_ecocrop.GROUPS_FILE], build_index)
+
+# -------------------- QUERY STRING --------------------
+def parse_range(text: str):
+    """'temp_min:10:18' -> ("temp_min", 10.0, 18.0); either bound may be empty."""
+    parts = text.split(":")
+    if len(parts) != 3 or parts[0] not in NUMERIC:
+        raise ValueError(f"Range '{text}' should be name:low:high with name one of {', '.join(NUMERIC)}")
+    name, low, high = parts
+    try:
+        return name, float(low) if low else None, float(high) if high else None
+    except ValueError:
+        raise ValueError(f"Range '{text}' has a bound that is not a number")
+
+def site_ranges(site: dict, fit: str = "tolerated"):
+    """{"temperature": 24} -> ranges requiring the crop's tolerated (or optimal) range to contain 24."""
+    ranges = []
+    for condition, value in site.items():
+        if value is None:
+            continue
+        lower, upper = SITE_RANGES[condition][fit]
+        ranges += [(lower, None, value), (upper, value, None)]
+    return ranges
+
+def search(facets: dict, ranges=(), site: dict = None, fit: str = "tolerated", limit: int = 100):
+    predicates = [parse_range(r) for r in ranges] + site_ranges(site or {}, fit)
+    return facet_index.get().query(facets, predicates, limit)
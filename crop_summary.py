@@ -1,9 +1,10 @@
 import pandas as pd
 from pathlib import Path
 
-DATA_FILE = Path(__file__).parent / "data" / "ecocrop_utf8.csv"
+from read_ecocrop import ecocrop
+import cpu_pool
 
-_df_cache = None
+DATA_FILE = Path(__file__).parent / "data" / "ecocrop_utf8.csv"
 
 
 def safe(value, default=""):
@@ -12,9 +13,13 @@ def safe(value, default=""):
     return value
 
 
-def find_row_by_common_name(df, search_name):
+def find_row_by_common_name(df, search_name, name_index=None):
     search_name = search_name.lower().strip()
 
+    if name_index is not None:
+        hits = name_index.loc[name_index["name"] == search_name, "row"]
+        return df.iloc[int(hits.iloc[0])] if len(hits) else None
+
     for _, row in df.iterrows():
         comnames = safe(row["COMNAME"]).lower().split(",")
         comnames = [n.strip() for n in comnames]
@@ -77,17 +82,16 @@ def generate_crop_paragraph(row, crop_name):
 
 
 def get_crop_summary(common_name):
-    global _df_cache
-
-    if _df_cache is None:
-        _df_cache = pd.read_csv(DATA_FILE)
+    bundle = ecocrop.get()
+    if bundle["df"] is None:
+        return "Crop not found. Please try another common name."
 
-    row = find_row_by_common_name(_df_cache, common_name)
+    row = find_row_by_common_name(bundle["df"], common_name, bundle["names"])
 
     if row is None:
         return "Crop not found. Please try another common name."
 
-    return generate_crop_paragraph(row, common_name)
+    return cpu_pool.run(generate_crop_paragraph, row.to_dict(), common_name)
 
 
 if __name__ == "__main__":
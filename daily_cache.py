@@ -1,50 +1,20 @@
 import os
 import json
-from datetime import datetime
+import threading
+import time
+from metrics import CACHE_LOOKUPS
 from weekly_scraper import get_weekly_forecast  # use weekly scraper
+# Daily and weekly forecasts share one cache; reading and writing it lives in weekly_cache
+from weekly_cache import cache_version, load_cache, save_cache, clean_old_days
+import districts as district_table
 
 # -------------------- CONFIG --------------------
-CACHE_DIR = "cache/weekly_cache"
 DISTRICTS_FILE = "cache/districts.json"
-os.makedirs(CACHE_DIR, exist_ok=True)
+STALE_AFTER_SECONDS = 2 * 60 * 60  # cache hits older than this are counted as stale
+NEGATIVE_CACHE_SECONDS = 60  # failed scrapes are not retried for this long
 os.makedirs(os.path.dirname(DISTRICTS_FILE), exist_ok=True)
 
-
-# -------------------- CACHE HANDLING --------------------
-# -------------------- CACHE HANDLING --------------------
-def cache_file_path(district: str):
-    return os.path.join(CACHE_DIR, f"{district.lower()}_weekly.json")
-
-def load_cache(district: str):
-    path = cache_file_path(district)
-    if os.path.exists(path):
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return None
-
-
-def save_cache(district: str, data: dict):
-    path = cache_file_path(district)
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-
-def clean_old_days(forecast_data):
-    """Remove past days so the cache always starts from today."""
-    today = datetime.now().date()
-    new_data = []
-    for table in forecast_data.get("data", []):
-        table_date_str = table.get("date")
-        if not table_date_str:
-            continue
-        try:
-            table_date = datetime.strptime(table_date_str, "%A %d %B").replace(year=today.year).date()
-        except:
-            continue
-        if table_date >= today:
-            new_data.append(table)
-    forecast_data["data"] = new_data
-    return forecast_data
-
+_failed_until = {}  # district -> time until which a failed scrape isn't retried
 
 
 # -------------------- DISTRICT LIST HANDLING --------------------
@@ -55,8 +25,10 @@ def load_districts():
     return []
 
 def save_districts(districts):
-    with open(DISTRICTS_FILE, "w", encoding="utf-8") as f:
+    tmp = f"{DISTRICTS_FILE}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
         json.dump(sorted(set(districts)), f, indent=2)
+    os.replace(tmp, DISTRICTS_FILE)
 
 
 
@@ -68,11 +40,12 @@ def fetch_daily_forecast(district: str):
     - Return cache if exists
     - Otherwise fetch using weekly scraper, clean, save cache, then return
     """
-    district_key = district.lower()
+    district_key = district_table.resolve(district) or district.lower()
+    known = district_table.resolve(district_key) is not None
 
     # 🔴 ADD THIS BLOCK
     districts = load_districts()
-    if district_key not in districts:
+    if known and district_key not in districts:
         districts.append(district_key)
         save_districts(districts)
     # 🔴 END ADD
@@ -80,7 +53,18 @@ def fetch_daily_forecast(district: str):
 
     cache = load_cache(district_key)
     if cache:
+        stale = time.time() - cache_version(district_key) / 1e9 > STALE_AFTER_SECONDS
+        CACHE_LOOKUPS.inc(cache="daily", result="stale" if stale else "hit")
         return cache
+    CACHE_LOOKUPS.inc(cache="daily", result="miss")
+
+    # Names outside the bundled district table are never scraped
+    if not known:
+        return {"district": district.title(), "data": []}
+
+    # A district that just failed isn't scraped again until the negative entry expires
+    if _failed_until.get(district_key, 0) > time.time():
+        return {"district": district.title(), "data": []}
 
     try:
         # use weekly scraper for daily data
@@ -88,7 +72,8 @@ def fetch_daily_forecast(district: str):
     except Exception:
         forecast = []
 
-    if not forecast:
+    if not forecast or isinstance(forecast, dict):
+        _failed_until[district_key] = time.time() + NEGATIVE_CACHE_SECONDS
         return {"district": district.title(), "data": []}
 
     json_data = {
@@ -1,18 +1,25 @@
-import requests
+from upstream import fetch
 from bs4 import BeautifulSoup
 from datetime import datetime, timedelta
 
+from metrics import SCRAPER_PARSE_SECONDS, SCRAPER_FETCH_SECONDS
+
 def get_daily_forecast(district: str):
     """
     Returns a list of daily forecasts for the week.
     Each item: {"date": "Sunday 21 December", "rows": [...]}
     """
     url = f"https://www.metmalawi.gov.mw/weather/daily-table/{district.lower()}/"
-    response = requests.get(url, timeout=10)
+    with SCRAPER_FETCH_SECONDS.time(district=district.lower()):
+        response = fetch(url)
     if response.status_code != 200:
         return []
 
-    soup = BeautifulSoup(response.text, "html.parser")
+    with SCRAPER_PARSE_SECONDS.time(district=district.lower()):
+        return parse_daily_tables(response.text)
+
+def parse_daily_tables(html: str):
+    soup = BeautifulSoup(html, "html.parser")
     tables = soup.find_all("table")
     if not tables:
         return []
@@ -0,0 +1,53 @@
+import csv
+import re
+from pathlib import Path
+
+import numpy as np
+
+import reloader
+
+# -------------------- CONFIG --------------------
+DISTRICTS_TABLE = Path(__file__).parent / "data" / "malawi_districts.csv"
+EARTH_RADIUS_KM = 6371.0
+MAX_NEAREST_KM = 150.0  # farther than this from every district headquarters is outside Malawi
+
+def normalize(name: str):
+    """'Nkhata Bay', 'nkhata-bay' and 'NKHATABAY' all become 'nkhatabay'."""
+    return re.sub(r"[\s_\-']+", "", str(name).strip().lower())
+
+# -------------------- TABLE --------------------
+def load_district_table():
+    """All district slugs metmalawi publishes forecasts for, with display names, regions and coordinates."""
+    with open(DISTRICTS_TABLE, "r", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+def build_lookup():
+    """
+    Slug lookup by slug or display name, and the headquarters coordinates as
+    radians for the nearest-district search. With 29 districts one vectorized
+    haversine pass over all of them beats walking a KD-tree or grid.
+    """
+    rows = load_district_table()
+    by_name = {}
+    for row in rows:
+        by_name[normalize(row["slug"])] = row["slug"]
+        by_name[normalize(row["name"])] = row["slug"]
+    coords = np.radians(np.array([[float(r["lat"]), float(r["lon"])] for r in rows]))
+    return {"rows": rows, "by_name": by_name, "lat": coords[:, 0], "lon": coords[:, 1]}
+
+table = reloader.register("districts", [DISTRICTS_TABLE], build_lookup)
+
+# -------------------- LOOKUPS --------------------
+def resolve(name: str):
+    """metmalawi slug for a district slug or name, None when it is not a known district."""
+    return table.get()["by_name"].get(normalize(name))
+
+def nearest(lat: float, lon: float):
+    """(table row, distance in km) of the district headquarters closest to the point."""
+    lookup = table.get()
+    lat, lon = np.radians(lat), np.radians(lon)
+    a = (np.sin((lookup["lat"] - lat) / 2) ** 2
+         + np.cos(lat) * np.cos(lookup["lat"]) * np.sin((lookup["lon"] - lon) / 2) ** 2)
+    distances = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+    i = int(np.argmin(distances))
+    return lookup["rows"][i], float(distances[i])
@@ -0,0 +1,137 @@
+import os
+import json
+import fcntl
+import threading
+from contextlib import contextmanager
+
+from refresh_scheduler import content_hash
+
+# -------------------- CONFIG --------------------
+DELTA_DIR = os.environ.get("FORECAST_DELTA_DIR", "cache/deltas")
+DELTA_KINDS = ("deltas", "recent")  # precomputed deltas to the current version, and the versions they start from
+KEEP_VERSIONS = 5  # how many earlier versions a client can be behind and still get a delta
+
+os.makedirs(DELTA_DIR, exist_ok=True)
+
+_memory = {}  # district -> (mtime_ns, deltas document)
+
+def _path(district: str, kind: str):
+    return os.path.join(DELTA_DIR, f"{district.lower()}_{kind}.json")
+
+def _read(path, default):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+def _write(path, data):
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, path)
+
+@contextmanager
+def _district_lock(district: str):
+    """
+    Serialize read-modify-write of a district's delta files. Every caller opens
+    the lock file itself, so the flock holds across threads and across workers.
+    """
+    with open(_path(district, "lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+# -------------------- DIFF --------------------
+def diff(old: dict, new: dict):
+    """Days and hourly rows (keyed by date and Time) that changed from old to new."""
+    old_days = {day.get("date"): day.get("rows", []) for day in old.get("data", [])}
+    new_dates = {day.get("date") for day in new.get("data", [])}
+
+    days = []
+    for day in new.get("data", []):
+        date = day.get("date")
+        previous = {row.get("Time"): row for row in old_days.get(date, [])}
+        current_times = {row.get("Time") for row in day.get("rows", [])}
+        changed = [row for row in day.get("rows", []) if previous.get(row.get("Time")) != row]
+        removed = [t for t in previous if t not in current_times]
+        if changed or removed or date not in old_days:
+            days.append({"date": date, "rows": changed, "removed_times": removed})
+
+    return {
+        "dates": [day.get("date") for day in new.get("data", [])],  # current day order
+        "days": days,
+        "removed_days": [d for d in old_days if d not in new_dates],
+    }
+
+# -------------------- REFRESH SIDE --------------------
+def record(district: str, data: dict):
+    """
+    Stamp data with its version and precompute the deltas from the last
+    KEEP_VERSIONS versions to it. Called whenever a district's cache is saved.
+    """
+    body = {k: v for k, v in data.items() if k != "version"}
+    version = content_hash(body)
+    data["version"] = version
+
+    with _district_lock(district):
+        recent = _read(_path(district, "recent"), [])
+        if recent and recent[-1]["version"] == version:
+            return version
+
+        deltas = {
+            entry["version"]: diff(entry["data"], body)
+            for entry in recent[-KEEP_VERSIONS:]
+        }
+        _write(_path(district, "deltas"), {"version": version, "deltas": deltas})
+        recent = (recent + [{"version": version, "data": body}])[-KEEP_VERSIONS:]
+        _write(_path(district, "recent"), recent)
+    return version
+
+# -------------------- REQUEST SIDE --------------------
+def load_deltas(district: str):
+    path = _path(district, "deltas")
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    hit = _memory.get(district.lower())
+    if hit and hit[0] == mtime:
+        return hit[1]
+    document = _read(path, None)
+    _memory[district.lower()] = (mtime, document)
+    return document
+
+def delta_since(district: str, since: str, current: dict):
+    """
+    Changes between the client's version and the current cache, or None when
+    that version is too old (or unknown) and the full body should be sent.
+    """
+    version = current.get("version")
+    base = {"district": current.get("district"), "version": version, "since": since, "delta": True}
+    if since == version:
+        return {**base, "dates": [day.get("date") for day in current.get("data", [])], "days": [], "removed_days": []}
+
+    document = load_deltas(district)
+    if not document or document.get("version") != version or since not in document["deltas"]:
+        return None
+    return {**base, **document["deltas"][since]}
+
+# -------------------- SNAPSHOTS --------------------
+def export_district(district: str):
+    """{kind: document} of the delta files stored for a district, for snapshot.py."""
+    documents = {}
+    for kind in DELTA_KINDS:
+        document = _read(_path(district, kind), None)
+        if document is not None:
+            documents[kind] = document
+    return documents
+
+def import_district(district: str, documents: dict):
+    """Store documents made by export_district; only call it with the forecast version they belong to."""
+    with _district_lock(district):
+        for kind in DELTA_KINDS:
+            if kind in documents:
+                _write(_path(district, kind), documents[kind])
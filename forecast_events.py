@@ -0,0 +1,82 @@
+import json
+import asyncio
+
+from weekly_cache import cache_version, load_cache
+from refresh_scheduler import content_hash
+
+# -------------------- CONFIG --------------------
+WATCH_SECONDS = 5        # how often cache versions of watched districts are checked
+KEEPALIVE_SECONDS = 15   # comment line sent to idle streams so proxies keep them open
+
+# -------------------- CHANNELS --------------------
+class Channel:
+    """Latest forecast for one district plus an event that fires when it changes."""
+
+    def __init__(self):
+        self.subscribers = 0
+        self.version = None
+        self.hash = None
+        self.data = None
+        self.changed = asyncio.Event()
+
+    def publish(self, data, digest):
+        self.data = data
+        self.hash = digest
+        # Wake everyone waiting on the old event; later waiters get a fresh one
+        fired, self.changed = self.changed, asyncio.Event()
+        fired.set()
+
+_channels = {}  # district -> Channel, only while someone is subscribed
+
+async def _check(district, channel):
+    version = cache_version(district)
+    if version is None or version == channel.version:
+        return
+    channel.version = version
+    data = await asyncio.to_thread(load_cache, district)
+    digest = data.get("version") or content_hash(data)  # same id clients pass as ?since=
+    if digest != channel.hash:
+        channel.publish(data, digest)
+
+async def watch():
+    """
+    One task per worker: picks up cache files rewritten by the refresh leader
+    and notifies the subscribers of districts whose content actually changed.
+    """
+    while True:
+        for district, channel in list(_channels.items()):
+            try:
+                await _check(district, channel)
+            except Exception as e:
+                print(f"[ERROR] Could not check weekly cache for {district}: {e}")
+        await asyncio.sleep(WATCH_SECONDS)
+
+# -------------------- SUBSCRIBERS --------------------
+def _event(channel):
+    payload = json.dumps(channel.data, ensure_ascii=False)
+    return f"event: forecast\nid: {channel.hash}\ndata: {payload}\n\n"
+
+async def subscribe(district: str, last_event_id: str = None):
+    """Server-sent events for one district: the current forecast, then one event per change."""
+    key = district.lower()
+    channel = _channels.setdefault(key, Channel())
+    channel.subscribers += 1
+    try:
+        if channel.hash is None:
+            await _check(key, channel)
+
+        sent = last_event_id
+        while True:
+            waiter = channel.changed
+            if channel.hash is not None and channel.hash != sent:
+                yield _event(channel)
+                sent = channel.hash
+                continue
+            try:
+                await asyncio.wait_for(waiter.wait(), KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+    finally:
+        channel.subscribers -= 1
+        if channel.subscribers == 0 and _channels.get(key) is channel:
+            del _channels[key]
@@ -0,0 +1,169 @@
+import math
+from datetime import datetime, date, time as dtime, timedelta, timezone
+from collections import Counter
+
+from interpretation import time_blocks, parse_temperature, parse_rainfall
+from forecast_history import valid_time
+
+# -------------------- FIELDS --------------------
+# query name -> column of the scraped hourly rows
+FIELDS = {
+    "weather": "Weather",
+    "max_temp": "Max Temp",
+    "min_temp": "Min Temp",
+    "rainfall": "Rainfall",
+    "wind_speed": "Wind Speed",
+    "wind_direction": "Wind Direction",
+}
+
+def parse_fields(fields: str):
+    """'rainfall,Max Temp' -> ["rainfall", "max_temp"]; raises ValueError on unknown names."""
+    names = []
+    for raw in fields.split(","):
+        name = raw.strip().lower().replace(" ", "_")
+        if not name or name == "time":
+            continue
+        if name not in FIELDS:
+            raise ValueError(f"Unknown field '{raw.strip()}', expected: {', '.join(FIELDS)}")
+        names.append(name)
+    return names
+
+# Forecast times are Malawi local time, which has no daylight saving
+FORECAST_TZ = timezone(timedelta(hours=2))
+
+def parse_bound(value: str, end: bool = False):
+    """
+    '2026-02-17' or '2026-02-17T06:00' -> naive local datetime; a bare date as
+    an end bound covers the whole day. A bound with a UTC offset is converted.
+    """
+    if len(value) == 10:
+        day = date.fromisoformat(value)
+        return datetime.combine(day, dtime(23, 59) if end else dtime(0, 0))
+    bound = datetime.fromisoformat(value)
+    if bound.tzinfo is not None:
+        bound = bound.astimezone(FORECAST_TZ).replace(tzinfo=None)
+    return bound
+
+# -------------------- AGGREGATION --------------------
+def _circular_mean(degrees):
+    if not degrees:
+        return None
+    x = sum(math.cos(math.radians(d)) for d in degrees)
+    y = sum(math.sin(math.radians(d)) for d in degrees)
+    return round(math.degrees(math.atan2(y, x)) % 360, 1)
+
+def _number(value):
+    """Float of a cell, None when it is blank, so missing wind readings don't count as calm."""
+    try:
+        return float(str(value).strip())
+    except ValueError:
+        return None
+
+def aggregate(rows, names):
+    """Block or day values: temperature extremes, total rain, peak wind, mean wind direction."""
+    def values(column, parse):
+        return [v for v in (parse(r.get(column, "")) for r in rows) if v is not None]
+
+    max_temps = values("Max Temp", parse_temperature)
+    min_temps = values("Min Temp", parse_temperature)
+    weather = Counter(r.get("Weather") for r in rows if r.get("Weather"))
+    out = {
+        "weather": weather.most_common(1)[0][0] if weather else "",
+        "max_temp": max(max_temps) if max_temps else None,
+        "min_temp": min(min_temps) if min_temps else None,
+        "rainfall": round(sum(values("Rainfall", parse_rainfall)), 1),
+        "wind_speed": max(values("Wind Speed", _number), default=None),
+        "wind_direction": _circular_mean(values("Wind Direction", _number)),
+    }
+    return {name: out[name] for name in names}
+
+def _hour(row):
+    """Hour of a row's Time cell, None when it is blank or malformed."""
+    try:
+        return int(str(row.get("Time", "")).split(":")[0])
+    except ValueError:
+        return None
+
+def blocks(rows, names):
+    result = []
+    for block_name, hours in time_blocks.items():
+        block_rows = [r for r in rows if _hour(r) in hours]
+        if block_rows:
+            result.append({
+                "block": block_name,
+                "start": block_rows[0].get("Time"),
+                "end": block_rows[-1].get("Time"),
+                **aggregate(block_rows, names),
+            })
+    return result
+
+# -------------------- SELECTION --------------------
+def select(forecast: dict, on: date = None, start: datetime = None, end: datetime = None,
+           fields=None, resolution: str = "hourly", today: datetime = None):
+    """
+    Days and hours of a cached forecast between the given bounds, with only the
+    requested fields, hourly or aggregated over interpretation.time_blocks or
+    whole days. Works on the cached document; nothing is scraped.
+    """
+    issued = today or datetime.now()
+    names = list(fields) if fields else list(FIELDS)
+    columns = ["Time"] + [FIELDS[n] for n in names]
+
+    days = []
+    for day in forecast.get("data", []):
+        label = day.get("date") or ""
+        try:
+            day_date = valid_time(label, "00:00", issued).date()
+        except ValueError:
+            continue
+        if on and day_date != on:
+            continue
+
+        rows = []
+        for row in day.get("rows", []):
+            try:
+                valid = valid_time(label, str(row.get("Time", "")), issued)
+            except ValueError:
+                continue
+            if (start and valid < start) or (end and valid > end):
+                continue
+            rows.append(row)
+        if not rows:
+            continue
+
+        entry = {"date": label, "iso_date": day_date.isoformat()}
+        if resolution == "day":
+            entry.update(aggregate(rows, names))
+        elif resolution == "block":
+            entry["blocks"] = blocks(rows, names)
+        else:
+            entry["rows"] = [{c: r.get(c, "") for c in columns} for r in rows]
+        days.append(entry)
+
+    return {
+        "district": forecast.get("district"),
+        "version": forecast.get("version"),
+        "resolution": resolution,
+        "fields": names,
+        "data": days,
+    }
+
+def parse_selection(on: date = None, start: str = None, end: str = None,
+                    fields: str = None, resolution: str = None):
+    """
+    Query-string arguments -> select() keywords, None when nothing is asked for.
+    Only invalid arguments raise ValueError; malformed forecast rows are skipped by select().
+    """
+    if not any((on, start, end, fields, resolution)):
+        return None
+    return {
+        "on": on,
+        "start": parse_bound(start) if start else None,
+        "end": parse_bound(end, end=True) if end else None,
+        "fields": parse_fields(fields) if fields else None,
+        "resolution": resolution or "hourly",
+    }
+
+def apply(forecast: dict, selection: dict):
+    """select() with parsed keywords; the cached document itself when nothing is asked for."""
+    return select(forecast, **selection) if selection else forecast
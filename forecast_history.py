@@ -0,0 +1,197 @@
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+
+from refresh_scheduler import content_hash
+
+# -------------------- CONFIG --------------------
+HISTORY_DB = os.environ.get("FORECAST_HISTORY_DB", "cache/forecast_history.sqlite3")
+MAX_ROWS = 20000  # hard cap on rows returned by one history query
+
+os.makedirs(os.path.dirname(HISTORY_DB), exist_ok=True)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS issues (
+    district     TEXT NOT NULL,
+    issued_at    TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    row_count    INTEGER NOT NULL,
+    PRIMARY KEY (district, issued_at)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS forecast_rows (
+    district       TEXT NOT NULL,
+    issued_at      TEXT NOT NULL,
+    valid_at       TEXT NOT NULL,
+    weather        TEXT,
+    max_temp       REAL,
+    min_temp       REAL,
+    rainfall       REAL,
+    wind_speed     REAL,
+    wind_direction REAL,
+    PRIMARY KEY (district, issued_at, valid_at)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS forecast_rows_by_valid ON forecast_rows (district, valid_at, issued_at);
+"""
+
+_local = threading.local()
+
+# -------------------- CONNECTION --------------------
+def connect():
+    """One connection per thread; WAL lets readers run while the leader appends."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(HISTORY_DB, timeout=5)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        _local.conn = conn
+    return conn
+
+# -------------------- PARSING --------------------
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+
+def _number(value):
+    match = _NUMBER.search(value or "")
+    return float(match.group()) if match else None
+
+def valid_time(day_label: str, time_label: str, issued: datetime):
+    """'Tuesday 17 February' + '22:00' -> datetime in the year of issue (or the next one in January)."""
+    # Parsed against a leap year: strptime alone would use 1900 and reject 29 February
+    _, _, day_month = day_label.strip().partition(" ")
+    day = datetime.strptime(f"{day_month} 2000", "%d %B %Y")
+    year = issued.year + 1 if day.month < issued.month - 6 else issued.year
+    hour, _, minute = time_label.partition(":")
+    return datetime(year, day.month, day.day, int(hour), int(minute or 0))
+
+def forecast_rows(data: dict, issued: datetime):
+    for day in data.get("data", []):
+        for row in day.get("rows", []):
+            try:
+                valid = valid_time(day.get("date", ""), row.get("Time", ""), issued)
+            except ValueError:
+                continue
+            yield (
+                valid.isoformat(timespec="minutes"),
+                row.get("Weather", ""),
+                _number(row.get("Max Temp")),
+                _number(row.get("Min Temp")),
+                _number(row.get("Rainfall")),
+                _number(row.get("Wind Speed")),
+                _number(row.get("Wind Direction")),
+            )
+
+# -------------------- WRITE --------------------
+def append(district: str, data: dict, issued: datetime = None):
+    """
+    Record a refreshed forecast. Rows are only stored when the content differs
+    from the district's previous issue, since most hourly refreshes repeat it.
+    """
+    issued = issued or datetime.now()
+    issued_at = issued.isoformat(timespec="seconds")
+    key = district.lower()
+    digest = content_hash(data)
+    conn = connect()
+
+    last = conn.execute(
+        "SELECT content_hash FROM issues WHERE district = ? ORDER BY issued_at DESC LIMIT 1", (key,)
+    ).fetchone()
+    rows = [] if last and last["content_hash"] == digest else list(forecast_rows(data, issued))
+
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO issues (district, issued_at, content_hash, row_count) VALUES (?, ?, ?, ?)",
+            (key, issued_at, digest, len(rows)),
+        )
+        conn.executemany(
+            "INSERT OR REPLACE INTO forecast_rows "
+            "(district, issued_at, valid_at, weather, max_temp, min_temp, rainfall, wind_speed, wind_direction) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(key, issued_at) + row for row in rows],
+        )
+
+def safe_append(district: str, data: dict):
+    try:
+        append(district, data)
+    except Exception as e:
+        print(f"[ERROR] Could not record forecast history for {district}: {e}")
+
+# -------------------- QUERY --------------------
+ROW_COLUMNS = "valid_at, weather, max_temp, min_temp, rainfall, wind_speed, wind_direction"
+
+def _issue_rows(conn, key, start, end_bound, limit):
+    """
+    Issues published in the range, each with its rows. An unchanged issue
+    stores no rows of its own (see append); it is answered with the rows of
+    the last issue that had them and marked unchanged_from.
+    """
+    issues = []
+    count = 0
+    for issue in conn.execute(
+        "SELECT issued_at, row_count FROM issues WHERE district = ? AND issued_at >= ? AND issued_at <= ? "
+        "ORDER BY issued_at", (key, start, end_bound),
+    ):
+        source = issue["issued_at"]
+        if issue["row_count"] == 0:
+            previous = conn.execute(
+                "SELECT issued_at FROM issues WHERE district = ? AND issued_at < ? AND row_count > 0 "
+                "ORDER BY issued_at DESC LIMIT 1", (key, source),
+            ).fetchone()
+            if previous is None:
+                continue
+            source = previous["issued_at"]
+        rows = conn.execute(
+            f"SELECT {ROW_COLUMNS} FROM forecast_rows WHERE district = ? AND issued_at = ? ORDER BY valid_at LIMIT ?",
+            (key, source, limit - count),
+        ).fetchall()
+        entry = {"issued_at": issue["issued_at"], "rows": [dict(r) for r in rows]}
+        if source != issue["issued_at"]:
+            entry["unchanged_from"] = source
+        issues.append(entry)
+        count += len(rows)
+        if count >= limit:
+            break
+    return issues, count
+
+def query(district: str, start: str, end: str, by: str = "issued", limit: int = MAX_ROWS):
+    """
+    Past forecasts for a district between two ISO dates (inclusive), selected
+    by issue time or by valid time, grouped per issue. By valid time each
+    valid_at appears once, as published by the latest issue that carried it.
+    """
+    column = "valid_at" if by == "valid" else "issued_at"
+    end_bound = end + "T23:59:59" if len(end) == 10 else end
+    limit = min(limit, MAX_ROWS)
+    conn = connect()
+
+    if by != "valid":
+        issues, count = _issue_rows(conn, district.lower(), start, end_bound, limit)
+    else:
+        cursor = conn.execute(
+            f"SELECT issued_at, {ROW_COLUMNS} FROM ("
+            f"SELECT *, ROW_NUMBER() OVER (PARTITION BY valid_at ORDER BY issued_at DESC) AS newest "
+            f"FROM forecast_rows WHERE district = ? AND valid_at >= ? AND valid_at <= ?"
+            f") WHERE newest = 1 ORDER BY issued_at, valid_at LIMIT ?",
+            (district.lower(), start, end_bound, limit),
+        )
+        issues = []
+        count = 0
+        for row in cursor:
+            if not issues or issues[-1]["issued_at"] != row["issued_at"]:
+                issues.append({"issued_at": row["issued_at"], "rows": []})
+            issues[-1]["rows"].append({k: row[k] for k in row.keys() if k != "issued_at"})
+            count += 1
+
+    return {
+        "district": district.title(),
+        "by": column.replace("_at", ""),
+        "start": start,
+        "end": end,
+        "rows": count,
+        "truncated": count >= limit,
+        "issues": issues,
+    }
@@ -0,0 +1,215 @@
+"""
+Storage for the forecast caches shared by weekly_cache and daily_cache.
+
+    python forecast_store.py migrate [json_dir]   # import cache/weekly_cache/*.json
+
+FORECAST_STORE picks the backend: "sqlite" (default, one WAL database) or
+"json" (one file per district, the original layout). Both store compact
+JSON and replace a district's forecast atomically.
+"""
+import os
+import sys
+import json
+import time
+import sqlite3
+import threading
+
+# -------------------- CONFIG --------------------
+FORECAST_STORE = os.environ.get("FORECAST_STORE", "sqlite")
+FORECAST_DB = os.environ.get("FORECAST_DB", "cache/forecasts.sqlite3")
+JSON_CACHE_DIR = os.environ.get("FORECAST_CACHE_DIR", "cache/weekly_cache")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS forecasts (
+    district TEXT PRIMARY KEY,
+    version  INTEGER NOT NULL,
+    body     BLOB NOT NULL
+) WITHOUT ROWID;
+"""
+
+def encode(data: dict):
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def _json_files(directory):
+    if not os.path.isdir(directory):
+        return []
+    return sorted(f for f in os.listdir(directory) if f.endswith("_weekly.json"))
+
+# -------------------- JSON FILES --------------------
+class JsonFileStore:
+    """One <district>_weekly.json per district; the file's mtime is its version."""
+
+    def __init__(self, directory=JSON_CACHE_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, district: str):
+        return os.path.join(self.directory, f"{district.lower()}_weekly.json")
+
+    def version(self, district: str):
+        try:
+            return os.stat(self.path(district)).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def read(self, district: str):
+        """(version, compact JSON bytes), or None when nothing is stored."""
+        path = self.path(district)
+        try:
+            with open(path, "rb") as f:
+                version = os.fstat(f.fileno()).st_mtime_ns
+                raw = f.read()
+        except FileNotFoundError:
+            return None
+        return version, encode(json.loads(raw))
+
+    def write(self, district: str, body: bytes, version: int = None):
+        """Store body; an explicit version becomes the file's mtime unless a newer one is stored."""
+        path = self.path(district)
+        current = self.version(district)
+        if version is not None and current is not None and current >= version:
+            return current
+        # Temp file + rename, so readers never see a half-written forecast
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(body)
+        if version is not None:
+            os.utime(tmp, ns=(version, version))
+        os.replace(tmp, path)
+        return os.stat(path).st_mtime_ns
+
+    def delete(self, district: str):
+        try:
+            os.remove(self.path(district))
+        except FileNotFoundError:
+            pass
+
+    def districts(self):
+        return [f[: -len("_weekly.json")] for f in _json_files(self.directory)]
+
+    def dump(self):
+        """[(district, version, body)] for every stored district."""
+        rows = []
+        for district in self.districts():
+            stored = self.read(district)
+            if stored is not None:
+                rows.append((district, *stored))
+        return rows
+
+# -------------------- SQLITE --------------------
+class SqliteStore:
+    """
+    All districts in one WAL database: each write is a single transaction and
+    readers in every worker run concurrently with the writer. Versions are
+    write times in nanoseconds, like the file mtimes they replace.
+    """
+
+    def __init__(self, path=FORECAST_DB):
+        self.path = path
+        self.local = threading.local()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def connect(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self.local.conn = conn
+        return conn
+
+    def version(self, district: str):
+        row = self.connect().execute(
+            "SELECT version FROM forecasts WHERE district = ?", (district.lower(),)
+        ).fetchone()
+        return row[0] if row else None
+
+    def read(self, district: str):
+        row = self.connect().execute(
+            "SELECT version, body FROM forecasts WHERE district = ?", (district.lower(),)
+        ).fetchone()
+        return (row[0], bytes(row[1])) if row else None
+
+    def write(self, district: str, body: bytes, version: int = None):
+        """Store body; without an explicit version it gets the write time, kept increasing per district."""
+        conn = self.connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT version FROM forecasts WHERE district = ?", (district.lower(),)).fetchone()
+            if version is None:
+                version = max(time.time_ns(), row[0] + 1) if row else time.time_ns()
+            elif row and row[0] >= version:
+                conn.execute("ROLLBACK")
+                return row[0]
+            conn.execute(
+                "INSERT OR REPLACE INTO forecasts (district, version, body) VALUES (?, ?, ?)",
+                (district.lower(), version, body),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return version
+
+    def delete(self, district: str):
+        self.connect().execute("DELETE FROM forecasts WHERE district = ?", (district.lower(),))
+
+    def districts(self):
+        return [r[0] for r in self.connect().execute("SELECT district FROM forecasts ORDER BY district")]
+
+    def dump(self):
+        """[(district, version, body)] for every district, read in one statement so they are consistent."""
+        return [
+            (district, version, bytes(body))
+            for district, version, body in self.connect().execute(
+                "SELECT district, version, body FROM forecasts ORDER BY district"
+            )
+        ]
+
+# -------------------- MIGRATION --------------------
+def migrate(target, source_dir=JSON_CACHE_DIR):
+    """
+    Copy <district>_weekly.json files into target, keeping their mtimes as
+    versions. Districts already stored with a newer version are left alone,
+    so running it again (or from several workers at once) is harmless.
+    """
+    migrated = 0
+    for fname in _json_files(source_dir):
+        path = os.path.join(source_dir, fname)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            version = os.stat(path).st_mtime_ns
+        except (OSError, ValueError) as e:
+            print(f"[ERROR] Skipping {path}: {e}")
+            continue
+        district = fname[: -len("_weekly.json")]
+        current = target.version(district)
+        if current is not None and current >= version:
+            continue
+        target.write(district, encode(data), version)
+        migrated += 1
+    return migrated
+
+def open_store():
+    if FORECAST_STORE == "json":
+        return JsonFileStore()
+    if FORECAST_STORE != "sqlite":
+        raise ValueError(f"Unknown FORECAST_STORE {FORECAST_STORE!r}, expected 'sqlite' or 'json'")
+    sqlite_store = SqliteStore()
+    # First start after switching backends: bring the existing JSON caches along
+    if not sqlite_store.districts():
+        migrated = migrate(sqlite_store)
+        if migrated:
+            print(f"[INFO] Migrated {migrated} forecast cache file(s) from {JSON_CACHE_DIR} to {FORECAST_DB}")
+    return sqlite_store
+
+store = open_store()
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "migrate":
+        print(__doc__)
+        sys.exit(1)
+    source = sys.argv[2] if len(sys.argv) > 2 else JSON_CACHE_DIR
+    print(f"[INFO] Migrated {migrate(SqliteStore(), source)} forecast cache file(s) from {source} to {FORECAST_DB}")
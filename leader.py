@@ -0,0 +1,53 @@
+import os
+import fcntl
+import asyncio
+
+# -------------------- CONFIG --------------------
+LOCK_FILE = os.environ.get("REFRESH_LOCK_FILE", "cache/refresh.lock")
+RETRY_SECONDS = 30  # how often followers check whether the leader is gone
+
+os.makedirs(os.path.dirname(LOCK_FILE), exist_ok=True)
+
+_lock_handle = None
+
+# -------------------- ELECTION --------------------
+def try_become_leader():
+    """
+    Take the refresh lock without blocking. The OS drops an flock when its
+    owner exits, so a crashed leader frees the lock for the next worker.
+    """
+    global _lock_handle
+    if _lock_handle is not None:
+        return True
+
+    handle = open(LOCK_FILE, "a+")
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        handle.close()
+        return False
+
+    handle.seek(0)
+    handle.truncate()
+    handle.write(str(os.getpid()))
+    handle.flush()
+    _lock_handle = handle
+    return True
+
+def is_leader():
+    return _lock_handle is not None
+
+def leader_pid():
+    try:
+        with open(LOCK_FILE, "r") as f:
+            return int(f.read().strip() or 0) or None
+    except (OSError, ValueError):
+        return None
+
+# -------------------- BACKGROUND TASK --------------------
+async def run_as_leader(task):
+    """Wait until this worker holds the lock, then run task() (e.g. auto_refresh)."""
+    while not try_become_leader():
+        await asyncio.sleep(RETRY_SECONDS)
+    print(f"[INFO] Worker {os.getpid()} is the refresh leader")
+    await task()
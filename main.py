@@ -1,23 +1,46 @@
-from fastapi import FastAPI, Query
+from fastapi import FastAPI, Query, Depends, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 import asyncio
+import json
 
 # --- IMPORT YOUR MODULES ---
 from daily_cache import fetch_daily_forecast
-from weekly_cache import auto_refresh, fetch_weekly_forecast
-from read_ecocrop import load_ecocrop_data, find_crops_by_soil
-from medic import search
+from weekly_cache import fetch_weekly_forecast, load_cache_bytes, load_districts, cache_version
+from read_ecocrop import ecocrop, find_crops_by_soil
+from medic import search, search_page, search_stream, MAX_PAGE_SIZE
 from crop_summary import get_crop_summary
 from seasonforecast import get_season_forecast
 from advise import generate_advice
+from shared_data import memory_report
+from leader import run_as_leader
+from prewarm import prewarm_then_refresh, readiness
+from refresh_scheduler import record_request, read_queue_state
+from metrics import MetricsMiddleware, SUPABASE_SECONDS, CONTENT_TYPE, render as render_metrics
+from profiling import ProfilingMiddleware, profiled, sampler
+from admin import require_admin, require_admin_token
+from admission import AdmissionMiddleware
+import forecast_events
+import forecast_history
+from forecast_deltas import delta_since
+import forecast_filters
+import alerts
+from upstream import breaker
+import planting_calendar
+import crop_facets
+import districts
+from autocomplete import autocomplete, MAX_LIMIT as AUTOCOMPLETE_MAX_LIMIT, MAX_DISTANCE
+import reloader
+import snapshot
+import cpu_pool
+from response_cache import ResponseCacheMiddleware, cache as response_cache
 
 
 
 from fastapi import File, UploadFile, Form, Request
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, Response, PlainTextResponse, StreamingResponse
 from supabase_client import supabase
-from datetime import datetime
+from datetime import datetime, date
 import uuid
 import os
 
@@ -27,6 +50,12 @@ import os
 # --- APP ---
 app = FastAPI()
 
+# Innermost: cached responses still count against the client's admission budget
+app.add_middleware(ResponseCacheMiddleware)
+
+# Admission control sits inside CORS so rejections still carry CORS headers
+app.add_middleware(AdmissionMiddleware)
+
 # CORS
 app.add_middleware(
     CORSMiddleware,
@@ -34,56 +63,247 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"]
 )
-
-# Load CSV ONCE
-ecocrop_df = load_ecocrop_data()
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(ProfilingMiddleware)
 
 # --- STARTUP ---
 @app.on_event("startup")
 async def startup_event():
-    asyncio.create_task(auto_refresh())
+    # A snapshot from a running instance makes this one warm before it starts refreshing
+    await asyncio.to_thread(snapshot.import_at_startup)
+    # Every worker competes for the lock; only the leader scrapes metmalawi
+    asyncio.create_task(run_as_leader(prewarm_then_refresh))
+    asyncio.create_task(forecast_events.watch())
+    # Loads the reference datasets off the event loop, then hot-reloads them when their files change
+    asyncio.create_task(reloader.watch())
+
+@app.on_event("shutdown")
+def shutdown_event():
+    cpu_pool.shutdown()
+
+@app.exception_handler(cpu_pool.PoolBusy)
+def pool_busy_handler(request: Request, exc: cpu_pool.PoolBusy):
+    return JSONResponse({"error": "Server busy, please retry"}, status_code=503, headers={"Retry-After": "1"})
 
 # --- ROUTES ---
 @app.get("/")
 def root():
     return {"message": "API running"}
 
+@app.get("/ready")
+def ready():
+    status = readiness()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+# Filters shared by the forecast routes; applied to the cached forecast, never re-scraped
+def forecast_selection(
+    on: date = Query(None, alias="date", description="Only this day, e.g. 2026-02-17"),
+    start: str = Query(None, alias="from", description="From day or hour, e.g. 2026-02-17T06:00"),
+    end: str = Query(None, alias="to", description="Up to day (inclusive) or hour"),
+    fields: str = Query(None, description="Comma separated, e.g. rainfall,max_temp"),
+    resolution: str = Query(None, pattern="^(hourly|block|day)$"),
+):
+    return {"on": on, "start": start, "end": end, "fields": fields, "resolution": resolution}
+
+def select_forecast(forecast, selection):
+    try:
+        parsed = forecast_filters.parse_selection(**selection)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    return forecast_filters.apply(forecast, parsed)
+
+def known_district(district: str):
+    """Slug of a bundled or already cached district; anything else is a 404, before any scrape."""
+    slug = districts.resolve(district)
+    if slug is None and cache_version(district.lower()) is None:
+        raise HTTPException(status_code=404, detail=f"Unknown district '{district}'")
+    return slug or district.lower()
+
 @app.get("/daily-forecast/{district}")
-def daily_forecast(district: str):
-    return fetch_daily_forecast(district)
+@profiled
+def daily_forecast(district: str, selection: dict = Depends(forecast_selection)):
+    district = known_district(district)
+    record_request(district)
+    return select_forecast(fetch_daily_forecast(district), selection)
+
+@app.get("/weekly")
+def weekly_forecast_batch(
+    request: Request,
+    districts: str = Query(..., description="Comma separated districts, or 'all'"),
+    format: str = Query(None, pattern="^(json|ndjson)$"),
+):
+    # Only cached districts are returned; a batch never triggers scrapes
+    names = load_districts() if districts.strip().lower() == "all" else list(dict.fromkeys(
+        known_district(d.strip()) for d in districts.split(",") if d.strip()
+    ))
+    for name in names:
+        record_request(name)
+
+    if format == "ndjson" or (format is None and "application/x-ndjson" in request.headers.get("accept", "")):
+        def lines():
+            for name in names:
+                raw = load_cache_bytes(name)
+                if raw is not None:
+                    yield raw + b"\n"
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    parts, missing = [], []
+    for name in names:
+        raw = load_cache_bytes(name)
+        if raw is None:
+            missing.append(name)
+        else:
+            parts.append(json.dumps(name).encode("utf-8") + b":" + raw)
+    body = b'{"districts":{' + b",".join(parts) + b'},"missing":' + json.dumps(missing).encode("utf-8") + b"}"
+    return Response(body, media_type="application/json")
 
 @app.get("/weekly/{district}")
-def weekly_forecast(district: str):
-    return fetch_weekly_forecast(district)
+@profiled
+def weekly_forecast(
+    district: str,
+    since: str = Query(None, description="Version the client already holds"),
+    selection: dict = Depends(forecast_selection),
+):
+    district = known_district(district)
+    record_request(district)
+    forecast = fetch_weekly_forecast(district)
+    filtered = any(selection.values())
+    if since and not filtered:
+        delta = delta_since(district, since, forecast)
+        if delta is not None:
+            return delta
+    return select_forecast(forecast, selection)
+
+@app.get("/forecast/nearest")
+@profiled
+def nearest_forecast(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    selection: dict = Depends(forecast_selection),
+):
+    row, distance = districts.nearest(lat, lon)
+    if distance > districts.MAX_NEAREST_KM:
+        raise HTTPException(status_code=404, detail=f"No district within {districts.MAX_NEAREST_KM:.0f} km of {lat}, {lon}")
+    record_request(row["slug"])
+    forecast = select_forecast(fetch_weekly_forecast(row["slug"]), selection)
+    if isinstance(forecast, Response):
+        return forecast
+    return {
+        "nearest": {"district": row["slug"], "name": row["name"], "region": row["region"],
+                    "distance_km": round(distance, 1)},
+        "forecast": forecast,
+    }
+
+@app.get("/weekly/{district}/stream")
+def weekly_forecast_stream(district: str, request: Request):
+    district = known_district(district)
+    record_request(district)
+    return StreamingResponse(
+        forecast_events.subscribe(district, request.headers.get("last-event-id")),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/weekly/{district}/history")
+def weekly_forecast_history(
+    district: str,
+    start: date = Query(..., description="First day, e.g. 2026-01-01"),
+    end: date = Query(..., description="Last day (inclusive)"),
+    by: str = Query("issued", pattern="^(issued|valid)$",
+                    description="issued: every issue in the range; valid: the latest forecast for each valid time"),
+    limit: int = Query(5000, ge=1, le=forecast_history.MAX_ROWS),
+):
+    district = known_district(district)
+    return forecast_history.query(district, start.isoformat(), end.isoformat(), by, limit)
+
+@app.get("/alerts")
+def alerts_api(
+    district: str = Query(None, description="District name, e.g. Zomba"),
+    type: str = Query(None, pattern="^(heavy_rain|strong_wind)$"),
+    on: date = Query(None, alias="date", description="Only this day, e.g. 2026-02-17"),
+):
+    if district:
+        district = known_district(district)
+    return alerts.query(district, type, on.isoformat() if on else None)
 
 @app.get("/query-crops/")
+@profiled
 def query_crops(
     fertility: str = Query(...),
     drainage: str = Query(...),
     texture: str = Query(...)
 ):
-    return find_crops_by_soil(fertility, drainage, texture, ecocrop_df)
+    bundle = ecocrop.get()
+    return find_crops_by_soil(fertility, drainage, texture, bundle["df"], bundle["groups"])
+
+@app.get("/api/crops/search")
+@profiled
+def crop_search_api(
+    request: Request,
+    temperature: float = Query(None, description="Site temperature in °C the crop must tolerate"),
+    rainfall: float = Query(None, description="Annual rainfall in mm the crop must tolerate"),
+    ph: float = Query(None, description="Soil pH the crop must tolerate"),
+    fit: str = Query("tolerated", pattern="^(tolerated|optimal)$"),
+    ranges: list[str] = Query(None, alias="range", description="name:low:high, e.g. temp_opt_min:15:22"),
+    limit: int = Query(100, ge=0, le=crop_facets.MAX_RESULTS),
+):
+    """
+    Facets are repeatable parameters named after crop_facets.FACETS (plus
+    group), e.g. ?life_span=annual&category=vegetables&category=pulses (grain legumes).
+    """
+    facets = {name: request.query_params.getlist(name) for name in [*crop_facets.FACETS, "group"]}
+    site = {"temperature": temperature, "rainfall": rainfall, "ph": ph}
+    try:
+        return crop_facets.search(facets, ranges or [], site, fit, limit)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
 
 @app.get("/api/medic")
+@profiled
 def medic_api(
+    request: Request,
     query: str = Query(...),
-    search_type: str = Query("plant")
+    search_type: str = Query("plant"),
+    limit: int = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size; pages carry next_cursor"),
+    cursor: str = Query(None, description="next_cursor of the previous page"),
+    format: str = Query(None, pattern="^(json|ndjson)$"),
 ):
-    return search(query, search_type)
+    if format == "ndjson" or (format is None and "application/x-ndjson" in request.headers.get("accept", "")):
+        return StreamingResponse(search_stream(query, search_type), media_type="application/x-ndjson")
+    # Without limit or cursor the whole match list is returned, as medic.html expects
+    if limit is None and cursor is None:
+        return search(query, search_type)
+    try:
+        return search_page(query, search_type, limit or 50, cursor)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
 
 @app.get("/api/crop-summary")
+@profiled
 def crop_summary_api(
     name: str = Query(..., description="Crop name")
 ):
     return get_crop_summary(name)
 
+@app.get("/api/autocomplete")
+@profiled
+def autocomplete_api(
+    q: str = Query(..., min_length=1, description="Beginning of a crop or plant name"),
+    limit: int = Query(10, ge=1, le=AUTOCOMPLETE_MAX_LIMIT),
+    typos: int = Query(0, ge=0, le=MAX_DISTANCE, description="Edits tolerated in the typed prefix"),
+    source: str = Query(None, pattern="^(ecocrop|pfaf)$"),
+):
+    return autocomplete(q, limit, typos, source)
+
 @app.get("/api/season-forecast")
+@profiled
 def season_forecast_api(
     district: str = Query(..., description="District name, e.g. Zomba")
 ):
     return get_season_forecast(district)
 
 @app.get("/advise")
+@profiled
 def advise(
     crop: str = Query(...),
     district: str = Query(...)
@@ -91,6 +311,73 @@ def advise(
     result = generate_advice(crop, district)
     return {"advice": result}
 
+@app.get("/api/planting-calendar")
+@profiled
+def planting_calendar_api(
+    district: str = Query(None, description="District name, e.g. Zomba"),
+    crop: str = Query(None, description="Crop common name"),
+    on: date = Query(None, alias="date", description="Only crops that can still be planted on this day"),
+    limit: int = Query(500, ge=1, le=planting_calendar.MAX_RESULTS),
+):
+    return planting_calendar.query(district, crop, on, limit)
+
+@app.get("/metrics")
+def metrics_api():
+    return Response(render_metrics(), media_type=CONTENT_TYPE)
+
+@app.get("/admin/memory", dependencies=[Depends(require_admin)])
+def memory_api():
+    return memory_report()
+
+@app.get("/admin/datasets", dependencies=[Depends(require_admin)])
+def datasets_api():
+    return reloader.report()
+
+@app.get("/admin/response-cache", dependencies=[Depends(require_admin)])
+def response_cache_api():
+    return response_cache.report()
+
+@app.delete("/admin/response-cache", dependencies=[Depends(require_admin)])
+def response_cache_clear_api():
+    response_cache.clear()
+    return {"status": "Response cache cleared"}
+
+@app.get("/admin/snapshot", dependencies=[Depends(require_admin)])
+def snapshot_export_api():
+    data = snapshot.export_snapshot()
+    filename = f"forecast-snapshot-{datetime.now():%Y%m%d-%H%M%S}.tar.gz"
+    return Response(data, media_type="application/gzip",
+                    headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+@app.post("/admin/snapshot", dependencies=[Depends(require_admin_token)])
+async def snapshot_import_api(request: Request):
+    data = await request.body()
+    try:
+        return await asyncio.to_thread(snapshot.import_snapshot, data)
+    except ValueError as e:
+        return JSONResponse({"error": f"Invalid snapshot: {e}"}, status_code=400)
+
+@app.get("/admin/refresh-queue", dependencies=[Depends(require_admin)])
+def refresh_queue_api():
+    return read_queue_state()
+
+@app.get("/admin/upstream", dependencies=[Depends(require_admin)])
+def upstream_api():
+    return breaker.snapshot()
+
+@app.get("/admin/profile", dependencies=[Depends(require_admin)])
+def profile_api(top: int = Query(20, ge=1, le=200)):
+    return sampler.summary(top)
+
+@app.get("/admin/profile/collapsed", dependencies=[Depends(require_admin)])
+def profile_collapsed_api(route: str = Query(None, description="Route template, e.g. /advise")):
+    return PlainTextResponse(sampler.collapsed(route))
+
+@app.delete("/admin/profile", dependencies=[Depends(require_admin)])
+def profile_reset_api():
+    sampler.reset()
+    return {"status": "Profiles cleared"}
+
 # Static files
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
@@ -117,14 +404,16 @@ async def create_post(
 
         file_bytes = await image.read()
 
-        supabase.storage.from_("community-images").upload(
-            file_path,
-            file_bytes,
-            {"content-type": image.content_type},
-        )
+        with SUPABASE_SECONDS.time(operation="upload_image"):
+            supabase.storage.from_("community-images").upload(
+                file_path,
+                file_bytes,
+                {"content-type": image.content_type},
+            )
 
         # Safe handling for public URL
-        image_url_response = supabase.storage.from_("community-images").get_public_url(file_path)
+        with SUPABASE_SECONDS.time(operation="get_public_url"):
+            image_url_response = supabase.storage.from_("community-images").get_public_url(file_path)
         image_url = image_url_response.get("publicUrl") if isinstance(image_url_response, dict) else str(image_url_response)
 
     post_data = {
@@ -137,7 +426,8 @@ async def create_post(
         "created_at": datetime.utcnow().isoformat()
     }
 
-    supabase.table("community_posts").insert(post_data).execute()
+    with SUPABASE_SECONDS.time(operation="insert_post"):
+        supabase.table("community_posts").insert(post_data).execute()
 
     return {"status": "Post created successfully!"}
 
@@ -149,32 +439,35 @@ from fastapi.responses import JSONResponse
 # ---------------- GET ALL POSTS ----------------
 @app.get("/posts", response_class=JSONResponse)
 def get_posts():
-    response = (
-        supabase
-        .table("community_posts")
-        .select("*")
-        .order("created_at", desc=True)
-        .execute()
-    )
+    with SUPABASE_SECONDS.time(operation="list_posts"):
+        response = (
+            supabase
+            .table("community_posts")
+            .select("*")
+            .order("created_at", desc=True)
+            .execute()
+        )
     return response.data
 
 
 # ---------------- GET SINGLE POST ----------------
 @app.get("/posts/{post_id}", response_class=JSONResponse)
 def get_single_post(post_id: str):
-    response = (
-        supabase
-        .table("community_posts")
-        .select("*")
-        .eq("id", post_id)
-        .single()
-        .execute()
-    )
+    with SUPABASE_SECONDS.time(operation="get_post"):
+        response = (
+            supabase
+            .table("community_posts")
+            .select("*")
+            .eq("id", post_id)
+            .single()
+            .execute()
+        )
     return response.data
 
 
 # ---------------- DELETE POST ----------------
 @app.delete("/posts/{post_id}")
 def delete_post(post_id: str):
-    supabase.table("community_posts").delete().eq("id", post_id).execute()
+    with SUPABASE_SECONDS.time(operation="delete_post"):
+        supabase.table("community_posts").delete().eq("id", post_id).execute()
     return {"status": "Post deleted"}
@@ -1,19 +1,50 @@
 # medic.py
+import os
+import json
+import numpy as np
 import pandas as pd
 import re
 
-DATA_FILE = "data/pfaf_plants_merged_clean.csv"
+import shared_data
+import reloader
+import cpu_pool
+
+DATA_FILE = os.environ.get("PFAF_DATA_FILE", "data/pfaf_plants_merged_clean.csv")
+MAX_PAGE_SIZE = 500
+STREAM_BATCH_SIZE = 200  # plants converted per NDJSON chunk
+
+SEARCH_COLUMNS = {
+    "common_name": "Common Name",
+    "common_names": "Common Names",
+    "scientific_name": "Scientific Name",
+    "medicinal": "Medicinal Properties",
+}
+
+# Columns plant_to_json reads; only these are sent to the CPU pool
+PLANT_FIELDS = [
+    "Common Name", "Scientific Name", "Edibility Rating", "Edible Uses", "Medicinal Rating",
+    "Medicinal Properties", "Other Uses", "Care Requirements", "Propagation", "plant_url",
+]
 
 # =========================================================
 # Load data
 # =========================================================
-def load_plants():
+def read_plants_csv():
     df = pd.read_csv(DATA_FILE, low_memory=False)
     df.columns = df.columns.str.strip()
     df = df.fillna("")
+    df = df.astype({c: str for c in SEARCH_COLUMNS.values()})
+
+    # Lower-cased search columns are built once and shared with every worker
+    for key, col in SEARCH_COLUMNS.items():
+        df[f"_{key}_lc"] = df[col].str.lower()
     return df
 
-plants_df = load_plants()
+def load_plants():
+    return shared_data.attach("pfaf", DATA_FILE, read_plants_csv)
+
+# Rebuilt in the background when the PFAF CSV changes
+plants = reloader.register("pfaf", [DATA_FILE], load_plants)
 
 # =========================================================
 # Ratings → human language
@@ -160,24 +191,72 @@ def illness_to_json(row, illness):
 # =========================================================
 # Search
 # =========================================================
-def search(query, search_type="plant"):
-    query = query.lower()
-    results = []
+def plant_records(df):
+    """Matched rows as plain dicts, cheap to pickle for the CPU pool."""
+    return df[[c for c in PLANT_FIELDS if c in df.columns]].to_dict("records")
 
+def matches(plants_df, query, search_type="plant"):
+    """Row positions matching the query, in table order."""
+    query = query.lower()
     if search_type == "plant":
-        df = plants_df[
-            plants_df["Common Name"].str.lower().str.contains(query) |
-            plants_df["Common Names"].str.lower().str.contains(query) |
-            plants_df["Scientific Name"].str.lower().str.contains(query)
-        ]
-        for _, row in df.iterrows():
-            results.append(plant_to_json(row))
-
+        mask = (
+            plants_df["_common_name_lc"].str.contains(query) |
+            plants_df["_common_names_lc"].str.contains(query) |
+            plants_df["_scientific_name_lc"].str.contains(query)
+        )
     elif search_type == "illness":
-        df = plants_df[
-            plants_df["Medicinal Properties"].str.lower().str.contains(query)
-        ]
-        for _, row in df.iterrows():
-            results.append(illness_to_json(row, query))
+        mask = plants_df["_medicinal_lc"].str.contains(query)
+    else:
+        return np.array([], dtype="int64")
+    return np.flatnonzero(mask.to_numpy())
+
+def to_json(plants_df, positions, query, search_type):
+    records = plant_records(plants_df.iloc[positions])
+    if search_type == "illness":
+        return cpu_pool.map_batched(illness_to_json, records, query.lower())
+    return cpu_pool.map_batched(plant_to_json, records)
+
+def search(query, search_type="plant"):
+    """Every match at once; search_page and search_stream keep memory bounded."""
+    plants_df = plants.get()  # one version for the whole request, even if a reload lands meanwhile
+    return to_json(plants_df, matches(plants_df, query, search_type), query, search_type)
+
+# =========================================================
+# Pages and streams
+# =========================================================
+def encode_cursor(offset):
+    return f"{reloader.version('pfaf')}.{offset}"
+
+def decode_cursor(cursor):
+    """Offset of a cursor; raises ValueError when it is malformed or from another PFAF version."""
+    version, _, offset = (cursor or "").rpartition(".")
+    if not offset.isdigit():
+        raise ValueError("Malformed cursor")
+    if version != reloader.version("pfaf"):
+        raise ValueError("The plant data changed since this cursor was issued; start again without a cursor")
+    return int(offset)
+
+def search_page(query, search_type="plant", limit=50, cursor=None):
+    """
+    One page of matches. Only the page is converted to JSON; the match
+    positions are an int array, so a broad query costs a few bytes per match.
+    """
+    plants_df = plants.get()
+    offset = decode_cursor(cursor) if cursor else 0
+    positions = matches(plants_df, query, search_type)
+    page = positions[offset:offset + limit]
+    end = offset + len(page)
+    return {
+        "total": len(positions),
+        "count": len(page),
+        "results": to_json(plants_df, page, query, search_type),
+        "next_cursor": encode_cursor(end) if end < len(positions) else None,
+    }
 
-    return results
+def search_stream(query, search_type="plant"):
+    """NDJSON lines, converted one batch at a time as the client reads them."""
+    plants_df = plants.get()
+    positions = matches(plants_df, query, search_type)
+    for start in range(0, len(positions), STREAM_BATCH_SIZE):
+        docs = to_json(plants_df, positions[start:start + STREAM_BATCH_SIZE], query, search_type)
+        yield "".join(json.dumps(doc, ensure_ascii=False) + "\n" for doc in docs).encode("utf-8")
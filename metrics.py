@@ -0,0 +1,161 @@
+import time
+import threading
+from contextlib import contextmanager
+
+from starlette.routing import Match
+
+# -------------------- CONFIG --------------------
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_registry = []
+
+# -------------------- METRIC TYPES --------------------
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _label_text(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.values = {}
+        self.lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels):
+        return tuple(labels.get(n, "") for n in self.labels)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self):
+        lines = self.header()
+        with self.lock:
+            for key, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{_label_text(self.labels, key)} {value}")
+        return lines
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        with self.lock:
+            self.values[self._key(labels)] = value
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self.lock:
+            state = self.values.setdefault(key, {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0})
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["buckets"][i] += 1
+            state["sum"] += value
+            state["count"] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self):
+        lines = self.header()
+        with self.lock:
+            for key, state in sorted(self.values.items()):
+                bucket_labels = self.labels + ("le",)
+                for bound, n in zip(self.buckets, state["buckets"]):
+                    lines.append(f"{self.name}_bucket{_label_text(bucket_labels, key + (bound,))} {n}")
+                lines.append(f"{self.name}_bucket{_label_text(bucket_labels, key + ('+Inf',))} {state['count']}")
+                lines.append(f"{self.name}_sum{_label_text(self.labels, key)} {state['sum']}")
+                lines.append(f"{self.name}_count{_label_text(self.labels, key)} {state['count']}")
+        return lines
+
+def render():
+    """All registered metrics in Prometheus text format."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+# -------------------- APPLICATION METRICS --------------------
+REQUEST_SECONDS = Histogram("http_request_duration_seconds", "Request latency by route", ("route", "method", "status"))
+REQUESTS_IN_FLIGHT = Gauge("http_requests_in_flight", "Requests currently being handled", ("route",))
+SCRAPER_FETCH_SECONDS = Histogram("scraper_fetch_seconds", "metmalawi HTTP fetch time", ("district",))
+SCRAPER_PARSE_SECONDS = Histogram("scraper_parse_seconds", "metmalawi HTML parse time", ("district",))
+CACHE_LOOKUPS = Counter("forecast_cache_lookups_total", "Forecast cache lookups by result", ("cache", "result"))
+DATASET_LOAD_SECONDS = Gauge("dataset_load_seconds", "Time taken to build or map a dataset", ("dataset",))
+SUPABASE_SECONDS = Histogram("supabase_request_seconds", "Supabase call latency", ("operation",))
+
+# -------------------- MIDDLEWARE --------------------
+def match_route(scope):
+    """(path template, path params) of the route a request will hit, e.g. ("/weekly/{district}", {...})."""
+    router = scope["app"].router if "app" in scope else None
+    for route in getattr(router, "routes", []):
+        match, child = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", scope["path"]), child.get("path_params", {})
+    return "unmatched", {}
+
+def route_template(scope):
+    return match_route(scope)[0]
+
+class MetricsMiddleware:
+    """Times every HTTP request under its route template (e.g. /weekly/{district})."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route = route_template(scope)
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc(route=route)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUESTS_IN_FLIGHT.dec(route=route)
+            REQUEST_SECONDS.observe(time.perf_counter() - start,
+                                    route=route, method=scope["method"], status=status["code"])
@@ -0,0 +1,178 @@
+import os
+import re
+from datetime import date, timedelta
+
+import pandas as pd
+
+import reloader
+from seasonforecast import FORECAST_DIR, forecast_files
+from read_ecocrop import DATA_FILE as ECOCROP_FILE, ecocrop
+
+# -------------------- CONFIG --------------------
+DEFAULT_ONSET = (12, 1)        # used when a forecast names no onset (same default as /advise)
+DEFAULT_CESSATION = (3, 31)
+MAX_RESULTS = 5000             # hard cap on entries returned by one query
+
+MONTHS = {
+    name: number for number, name in enumerate(
+        ["january", "february", "march", "april", "may", "june", "july",
+         "august", "september", "october", "november", "december"], start=1)
+}
+# Part-of-month wording used in the metmalawi seasonal outlooks -> day of month
+PERIODS = {
+    "first week of": 4, "early": 5, "mid": 15, "mid-": 15, "middle of": 15,
+    "late": 25, "last week of": 24, "end of": 28,
+}
+
+_PERIOD = "|".join(sorted((re.escape(p) for p in PERIODS), key=len, reverse=True))
+_PHRASE = re.compile(rf"(?:({_PERIOD})\s*)?({'|'.join(MONTHS)})")
+_SEASON_YEARS = re.compile(r"(\d{4})/(\d{4})\s+rainfall season")
+
+# -------------------- SEASON DATES --------------------
+def phrase_date(phrase: str, season_start_year: int):
+    """'last week of November' -> date in the season starting that year (Jan-Jun fall in the next year)."""
+    match = _PHRASE.search(phrase.lower())
+    if not match:
+        return None
+    month = MONTHS[match.group(2)]
+    day = PERIODS.get(match.group(1), 1)
+    year = season_start_year + 1 if month <= 6 else season_start_year
+    return date(year, month, day)
+
+def _season_start_year(text: str, today: date):
+    match = _SEASON_YEARS.search(text)
+    if match:
+        return int(match.group(1))
+    return today.year if today.month >= 7 else today.year - 1
+
+def _mentioned(text: str, keyword: str):
+    """The bold phrase following the first mention of onset/cessation in a forecast."""
+    match = re.search(rf"{keyword}[^.]*?\*\*([^*]+)\*\*", text, re.IGNORECASE)
+    return match.group(1) if match else ""
+
+def season_dates(text: str, today: date = None):
+    """Onset and cessation dates from a seasonal forecast text."""
+    today = today or date.today()
+    year = _season_start_year(text, today)
+    onset = phrase_date(_mentioned(text, "onset"), year) or date(year, *DEFAULT_ONSET)
+    cessation = phrase_date(_mentioned(text, "cessation"), year) or date(year + 1, *DEFAULT_CESSATION)
+    return onset, cessation
+
+def read_seasons():
+    """District -> (onset, cessation) for every district with a seasonal forecast file."""
+    seasons = {}
+    for fname in sorted(os.listdir(FORECAST_DIR)):
+        if not fname.lower().endswith(".txt"):
+            continue
+        with open(os.path.join(FORECAST_DIR, fname), "r", encoding="utf-8") as f:
+            seasons[fname[:-4].lower()] = season_dates(f.read())
+    return seasons
+
+# -------------------- BUILD --------------------
+def _display_name(row):
+    for column in ("CommonEnglishName", "WidelyKnownAs"):
+        value = row.get(column)
+        if isinstance(value, str) and value.strip():
+            return value.strip()
+    comnames = row.get("COMNAME")
+    if isinstance(comnames, str) and comnames.strip():
+        return comnames.split(",")[0].strip()
+    return str(row.get("ScientificName", ""))
+
+def build_entries(crops, seasons):
+    """
+    One entry per crop x district. A crop is viable when GMIN days still fit
+    between onset and cessation; the latest viable planting date leaves GMIN
+    days before cessation, and the harvest window runs from onset + GMIN
+    (planted at onset) to latest planting + GMAX (planted last, slowest growth).
+    """
+    entries = []
+    for position, row in crops.iterrows():
+        gmin, gmax = row.get("GMIN"), row.get("GMAX")
+        if pd.isna(gmin) or pd.isna(gmax):
+            continue
+        gmin, gmax = int(gmin), int(max(gmin, gmax))
+        crop = {
+            "crop": _display_name(row),
+            "scientific_name": str(row.get("ScientificName", "")),
+            "gmin_days": gmin,
+            "gmax_days": gmax,
+        }
+        for district, (onset, cessation) in seasons.items():
+            latest = cessation - timedelta(days=gmin)
+            viable = latest >= onset
+            entries.append({
+                **crop,
+                "row": int(position),
+                "district": district,
+                "onset": onset,
+                "cessation": cessation,
+                "season_days": (cessation - onset).days,
+                "viable": viable,
+                "latest_planting": latest if viable else None,
+                "harvest_start": onset + timedelta(days=gmin) if viable else None,
+                "harvest_end": latest + timedelta(days=gmax) if viable else None,
+            })
+    return entries
+
+def build_calendar():
+    """Entries plus the by-district and by-crop lookups, for one EcoCrop version."""
+    bundle = ecocrop.get()
+    seasons = read_seasons()
+    entries = build_entries(bundle["df"], seasons) if bundle["df"] is not None else []
+
+    by_district, by_crop = {}, {}
+    for entry in entries:
+        by_district.setdefault(entry["district"], []).append(entry)
+        by_crop.setdefault(entry["row"], []).append(entry)
+
+    print(f"[INFO] Planting calendar built: {len(entries)} entries for {len(seasons)} district(s)")
+    return {
+        "entries": entries,
+        "by_district": by_district,
+        "by_crop": by_crop,
+        "districts": sorted(seasons),
+        "names": bundle["names"],  # crop rows in the entries refer to this EcoCrop version
+    }
+
+# Rebuilt when EcoCrop or any seasonal forecast file is edited, added or removed
+calendar = reloader.register(
+    "planting-calendar", lambda: [ECOCROP_FILE] + forecast_files(), build_calendar
+)
+
+def load_calendar():
+    return calendar.get()
+
+# -------------------- QUERY --------------------
+def _crop_rows(index, crop: str):
+    if index is None:
+        return []
+    hits = index.loc[index["name"] == crop.lower().strip(), "row"]
+    return [int(r) for r in hits]
+
+def query(district: str = None, crop: str = None, on: date = None, limit: int = MAX_RESULTS):
+    """
+    Calendar entries filtered by district, crop common name and/or a date on
+    which planting must still be possible (between onset and latest planting).
+    """
+    table = load_calendar()
+
+    if crop:
+        entries = [e for row in _crop_rows(table["names"], crop) for e in table["by_crop"].get(row, [])]
+    elif district:
+        entries = table["by_district"].get(district.lower(), [])
+    else:
+        entries = table["entries"]
+
+    if district:
+        entries = [e for e in entries if e["district"] == district.lower()]
+    if on:
+        entries = [e for e in entries if e["viable"] and e["onset"] <= on <= e["latest_planting"]]
+
+    limit = min(limit, MAX_RESULTS)
+    return {
+        "districts": table["districts"],
+        "count": len(entries),
+        "truncated": len(entries) > limit,
+        "entries": [{k: v for k, v in e.items() if k != "row"} for e in entries[:limit]],
+    }
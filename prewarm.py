@@ -0,0 +1,111 @@
+import os
+import json
+import time
+import asyncio
+
+from weekly_cache import auto_refresh, refresh_district, cache_version, load_districts, save_districts
+from districts import load_district_table
+
+# -------------------- CONFIG --------------------
+PREWARM_ENABLED = os.environ.get("PREWARM", "0") == "1"
+PREWARM_CONCURRENCY = int(os.environ.get("PREWARM_CONCURRENCY", "4"))
+PREWARM_STATUS_FILE = os.environ.get("PREWARM_STATUS_FILE", "cache/prewarm_status.json")  # written by the leader
+PREWARM_MAX_AGE_SECONDS = 60 * 60  # caches younger than this are not scraped again by prewarm
+# Districts a worker must be able to serve before it takes traffic; never derived from districts.json,
+# which prewarm itself grows
+DEFAULT_CRITICAL_DISTRICTS = ["balaka", "kasungu", "lilongwe", "mzuzu", "rumphi", "thyolo", "zomba"]
+
+_status = {"running": False, "done": [], "failed": [], "started": None, "finished": None}
+
+# -------------------- DISTRICT LISTS --------------------
+def _env_list(name):
+    value = os.environ.get(name, "")
+    return [d.strip().lower() for d in value.split(",") if d.strip()]
+
+def prewarm_districts():
+    """PREWARM_DISTRICTS (comma separated) or every district in the bundled table."""
+    return _env_list("PREWARM_DISTRICTS") or [row["slug"] for row in load_district_table()]
+
+def critical_districts():
+    """CRITICAL_DISTRICTS (comma separated) or DEFAULT_CRITICAL_DISTRICTS."""
+    return _env_list("CRITICAL_DISTRICTS") or DEFAULT_CRITICAL_DISTRICTS
+
+# -------------------- SHARED STATUS --------------------
+def write_status():
+    """Publish the leader's prewarm progress; followers never run prewarm and read it from here."""
+    tmp = f"{PREWARM_STATUS_FILE}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({**_status, "leader_pid": os.getpid()}, f, indent=2)
+    os.replace(tmp, PREWARM_STATUS_FILE)
+
+def read_status():
+    """Prewarm status as last written by the refresh leader; None before any leader wrote one."""
+    try:
+        with open(PREWARM_STATUS_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+# -------------------- READINESS --------------------
+def is_warm(district: str):
+    version = cache_version(district)
+    return version is not None and time.time() - version / 1e9 < PREWARM_MAX_AGE_SECONDS
+
+def readiness():
+    """
+    Ready once the leader's prewarm pass (if enabled) has finished and every
+    critical district has a cache. Cache age is left to the refresh
+    scheduler, which lets quiet districts go hours between refreshes. A
+    critical district whose prewarm scrape failed doesn't hold the worker
+    back; it is listed but the others are served.
+    """
+    cold = [d for d in critical_districts() if cache_version(d) is None]
+    status = read_status() if PREWARM_ENABLED else None
+    prewarming = PREWARM_ENABLED and (status is None or status["finished"] is None)
+    failed = status["failed"] if status else []
+    blocking = [d for d in cold if d not in failed]
+    return {
+        "ready": not prewarming and not blocking,
+        "cold_critical_districts": cold,
+        "prewarm": status,
+    }
+
+# -------------------- PREWARM --------------------
+async def prewarm():
+    """Fetch every configured district concurrently, critical ones first."""
+    critical = critical_districts()
+    districts = critical + [d for d in prewarm_districts() if d not in critical]
+    semaphore = asyncio.Semaphore(PREWARM_CONCURRENCY)
+
+    _status.update(running=True, done=[], failed=[], started=time.time(), finished=None)
+    write_status()
+
+    async def warm(district):
+        if is_warm(district):
+            _status["done"].append(district)
+            return
+        async with semaphore:
+            try:
+                data = await asyncio.to_thread(refresh_district, district)
+            except Exception as e:
+                print(f"[ERROR] Prewarm failed for {district}: {e}")
+                data = None
+        (_status["done"] if data else _status["failed"]).append(district)
+
+    await asyncio.gather(*(warm(d) for d in districts))
+
+    # Districts that scraped fine join the registry so the scheduler keeps them fresh
+    registered = load_districts()
+    new = [d for d in _status["done"] if d not in registered]
+    if new:
+        save_districts(registered + new)
+
+    _status.update(running=False, finished=time.time())
+    write_status()
+    print(f"[INFO] Prewarm finished: {len(_status['done'])} warm, {len(_status['failed'])} failed "
+          f"in {_status['finished'] - _status['started']:.1f}s")
+
+async def prewarm_then_refresh():
+    if PREWARM_ENABLED:
+        await prewarm()
+    await auto_refresh()
@@ -0,0 +1,163 @@
+import os
+import sys
+import time
+import random
+import threading
+import functools
+from contextvars import ContextVar
+from collections import Counter
+
+from starlette.datastructures import Headers
+
+from admin import is_admin
+from metrics import route_template
+
+# -------------------- CONFIG --------------------
+PROFILING_ENABLED = os.environ.get("PROFILING", "0") == "1"
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "0.01"))
+PROFILE_INTERVAL_SECONDS = float(os.environ.get("PROFILE_INTERVAL_MS", "5")) / 1000
+PROFILE_HEADER = "x-profile"       # "1" together with the admin token forces a profile
+MAX_STACKS_PER_ROUTE = 5000
+
+_profile_route = ContextVar("profile_route", default=None)
+
+# -------------------- SAMPLER --------------------
+def _frame_name(frame):
+    module = frame.f_globals.get("__name__") or os.path.basename(frame.f_code.co_filename)
+    return f"{module}:{frame.f_code.co_name}"
+
+class StackSampler:
+    """
+    Background thread that snapshots the stacks of threads running a profiled
+    request every PROFILE_INTERVAL_SECONDS and counts them per route.
+    """
+
+    def __init__(self):
+        self.active = {}   # thread ident -> route
+        self.stacks = {}   # route -> Counter of "outer;...;inner" stacks
+        self.requests = Counter()
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.thread = None
+
+    def begin(self, route):
+        with self.lock:
+            self.active[threading.get_ident()] = route
+            self.requests[route] += 1
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+                self.thread.start()
+        self.wake.set()
+
+    def end(self):
+        with self.lock:
+            self.active.pop(threading.get_ident(), None)
+
+    def _run(self):
+        while True:
+            with self.lock:
+                active = dict(self.active)
+            if not active:
+                self.wake.clear()
+                self.wake.wait()
+                continue
+
+            frames = sys._current_frames()
+            for ident, route in active.items():
+                frame = frames.get(ident)
+                names = []
+                while frame is not None:
+                    names.append(_frame_name(frame))
+                    frame = frame.f_back
+                if not names:
+                    continue
+                stack = ";".join(reversed(names))
+                with self.lock:
+                    counts = self.stacks.setdefault(route, Counter())
+                    if stack in counts or len(counts) < MAX_STACKS_PER_ROUTE:
+                        counts[stack] += 1
+            time.sleep(PROFILE_INTERVAL_SECONDS)
+
+    def reset(self):
+        with self.lock:
+            self.stacks.clear()
+            self.requests.clear()
+
+    def collapsed(self, route=None):
+        """Flamegraph-compatible collapsed stacks ("a;b;c count" per line)."""
+        with self.lock:
+            routes = [route] if route else list(self.stacks)
+            lines = []
+            for r in routes:
+                for stack, count in self.stacks.get(r, {}).items():
+                    lines.append(f"{r};{stack} {count}" if route is None else f"{stack} {count}")
+        return "\n".join(sorted(lines)) + "\n"
+
+    def summary(self, top=20):
+        """Per route: samples taken and the hottest functions by self and total samples."""
+        with self.lock:
+            snapshot = {r: Counter(c) for r, c in self.stacks.items()}
+            requests = dict(self.requests)
+
+        report = {}
+        for route, counts in snapshot.items():
+            own, total = Counter(), Counter()
+            for stack, n in counts.items():
+                names = stack.split(";")
+                own[names[-1]] += n
+                for name in set(names):
+                    total[name] += n
+            samples = sum(counts.values())
+            report[route] = {
+                "profiled_requests": requests.get(route, 0),
+                "samples": samples,
+                "interval_ms": PROFILE_INTERVAL_SECONDS * 1000,
+                "top_self": [{"function": f, "samples": n, "share": round(n / samples, 3)}
+                             for f, n in own.most_common(top)],
+                "top_total": [{"function": f, "samples": n, "share": round(n / samples, 3)}
+                              for f, n in total.most_common(top)],
+            }
+        return report
+
+sampler = StackSampler()
+
+# -------------------- HOOKS --------------------
+def profiled(fn):
+    """Profile fn in the thread it runs in when the middleware picked this request."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        route = _profile_route.get()
+        if route is None:
+            return fn(*args, **kwargs)
+        sampler.begin(route)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            sampler.end()
+    return wrapper
+
+class ProfilingMiddleware:
+    """
+    With PROFILING=1, marks a PROFILE_SAMPLE_RATE fraction of requests (and any
+    admin request sending "X-Profile: 1") for profiling by @profiled endpoints.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if not PROFILING_ENABLED or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        forced = headers.get(PROFILE_HEADER) == "1" and is_admin(headers)
+        if not forced and random.random() >= PROFILE_SAMPLE_RATE:
+            await self.app(scope, receive, send)
+            return
+
+        token = _profile_route.set(route_template(scope))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _profile_route.reset(token)
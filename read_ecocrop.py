@@ -2,6 +2,9 @@
 import pandas as pd
 from pathlib import Path
 
+import shared_data
+import reloader
+
 DATA_FILE = Path(__file__).parent / "data" / "ecocrop_utf8.csv"
 
 
@@ -51,7 +54,7 @@ def load_crop_groups():
 
 
 
-def load_ecocrop_data():
+def read_ecocrop_csv():
     try:
         df = pd.read_csv(DATA_FILE, encoding="utf-8")
         print(f"CSV loaded successfully with utf-8! {len(df)} rows, {len(df.columns)} columns")
@@ -66,6 +69,39 @@ def load_ecocrop_data():
     except Exception as e:
         print(f"Error reading CSV: {e}")
 
+
+def load_ecocrop_data():
+    """EcoCrop table, memory-mapped from the snapshot shared by all workers."""
+    return shared_data.attach("ecocrop", DATA_FILE, read_ecocrop_csv)
+
+
+def build_name_index():
+    """
+    One row per COMNAME alias -> position of the crop in the EcoCrop table,
+    so name lookups don't have to split COMNAME on every request.
+    """
+    df = read_ecocrop_csv()
+    if df is None:
+        return None
+    names = df["COMNAME"].fillna("").astype(str).str.lower().str.split(",")
+    index = names.explode().str.strip().to_frame("name")
+    index["row"] = index.index.astype("int64")
+    index = index[index["name"] != ""].drop_duplicates("name")
+    return index.reset_index(drop=True)
+
+
+def load_name_index():
+    return shared_data.attach("ecocrop-names", DATA_FILE, build_name_index)
+
+
+def build_ecocrop():
+    """Frame, name index and crop groups of one EcoCrop version, built together."""
+    return {"df": load_ecocrop_data(), "names": load_name_index(), "groups": load_crop_groups()}
+
+
+# Rebuilt in the background when the CSV or groups.txt changes
+ecocrop = reloader.register("ecocrop", [DATA_FILE, GROUPS_FILE], build_ecocrop)
+
 # --- New function: find crops by soil properties ---
 from collections import defaultdict
 
@@ -76,14 +112,38 @@ def safe_str(value):
         return value.strip()
     return ""
 
-def find_crops_by_soil(fertility: str, drainage: str, texture: str, df=None):
+def crop_display_name(row):
+    """(name shown to users, key into the crop groups), or None for a nameless row."""
+    common = safe_str(row.get("CommonEnglishName"))
+    widely = safe_str(row.get("WidelyKnownAs"))
+    scientific = safe_str(row.get("ScientificName"))
+
+    if common:
+        display_name = common
+        key_name = common.lower()
+    elif widely:
+        display_name = widely
+        key_name = widely.lower()
+    elif scientific:
+        display_name = scientific
+        key_name = scientific.split()[0].lower()
+    else:
+        return None
+
+    if common and widely:
+        display_name = f"{common} (widely known as {widely})"
+    return display_name, key_name
+
+def find_crops_by_soil(fertility: str, drainage: str, texture: str, df=None, crop_groups=None):
 
     if df is None:
-        df = load_ecocrop_data()
+        bundle = ecocrop.get()
+        df, crop_groups = bundle["df"], bundle["groups"]
     if df is None:
         return {}
 
-    crop_groups = load_crop_groups()
+    if crop_groups is None:
+        crop_groups = load_crop_groups()
 
     cols = ["FER", "FERR", "DRA", "DRAR", "TEXT", "TEXTR"]
     df = df.dropna(subset=cols, how="all").copy()
@@ -113,25 +173,10 @@ def find_crops_by_soil(fertility: str, drainage: str, texture: str, df=None):
     grouped_results = defaultdict(list)
 
     for _, row in filtered.iterrows():
-        common = safe_str(row.get("CommonEnglishName"))
-        widely = safe_str(row.get("WidelyKnownAs"))
-        scientific = safe_str(row.get("ScientificName"))
-
-        if common:
-            display_name = common
-            key_name = common.lower()
-        elif widely:
-            display_name = widely
-            key_name = widely.lower()
-        elif scientific:
-            display_name = scientific
-            key_name = scientific.split()[0].lower()
-        else:
+        names = crop_display_name(row)
+        if names is None:
             continue
-
-        if common and widely:
-            display_name = f"{common} (widely known as {widely})"
-
+        display_name, key_name = names
         group = crop_groups.get(key_name, "UNCLASSIFIED")
         grouped_results[group].append(display_name)
 
@@ -0,0 +1,209 @@
+import os
+import json
+import threading
+import time
+import random
+import asyncio
+import hashlib
+from datetime import datetime
+
+# -------------------- CONFIG --------------------
+DEMAND_DIR = "cache/demand"
+STATE_FILE = "cache/refresh_state.json"
+
+BASE_INTERVAL_SECONDS = 60 * 60      # refresh interval for a district at REFERENCE_DEMAND
+MIN_INTERVAL_SECONDS = 15 * 60       # hottest districts
+MAX_INTERVAL_SECONDS = 6 * 60 * 60   # districts nobody asks for
+REFERENCE_DEMAND = 10.0              # decayed requests that earn BASE_INTERVAL_SECONDS
+DEMAND_HALF_LIFE_SECONDS = 60 * 60
+DEMAND_FLUSH_SECONDS = 10
+MIN_DEMAND = 0.01                    # decayed scores below this are forgotten
+JITTER = 0.1                         # +/- 10% on every interval
+FAILURE_BACKOFF_SECONDS = 2 * 60
+MAX_BACKOFF_SECONDS = 2 * 60 * 60
+UNCHANGED_STRETCH = 1.5              # metmalawi hasn't published since last time -> check less often
+RESCAN_SECONDS = 60                  # longest sleep before demand is looked at again
+
+os.makedirs(DEMAND_DIR, exist_ok=True)
+
+# -------------------- DEMAND TRACKING (every worker) --------------------
+_demand = {}  # district -> decayed request count as of _demand_updated
+_demand_updated = time.time()
+_last_flush = 0.0
+_demand_lock = threading.Lock()
+_registered = None  # callable listing registered districts, see track_registry
+
+def track_registry(list_districts):
+    """Only registered districts keep demand scores; others are dropped at the next flush."""
+    global _registered
+    _registered = list_districts
+
+def _decay(score, seconds):
+    return score * 0.5 ** (seconds / DEMAND_HALF_LIFE_SECONDS)
+
+def record_request(district: str):
+    """Count a forecast request; scores are flushed to disk for the refresh leader."""
+    global _demand_updated, _last_flush
+    with _demand_lock:
+        now = time.time()
+        elapsed = now - _demand_updated
+        for key in _demand:
+            _demand[key] = _decay(_demand[key], elapsed)
+        _demand_updated = now
+
+        key = district.lower()
+        _demand[key] = _demand.get(key, 0.0) + 1
+
+        if now - _last_flush < DEMAND_FLUSH_SECONDS:
+            return
+        _last_flush = now
+        # Forget districts nobody asks for any more and ones no longer registered, so _demand stays bounded
+        registered = set(_registered()) if _registered else None
+        for stale in [k for k, score in _demand.items()
+                      if score < MIN_DEMAND or (registered is not None and k not in registered and k != key)]:
+            del _demand[stale]
+        path = os.path.join(DEMAND_DIR, f"{os.getpid()}.json")
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"updated": now, "scores": _demand}, f)
+        os.replace(tmp, path)
+
+def load_demand():
+    """Sum the decayed demand reported by all workers, dropping long-dead ones."""
+    now = time.time()
+    totals = {}
+    for fname in os.listdir(DEMAND_DIR):
+        if not fname.endswith(".json"):
+            continue
+        path = os.path.join(DEMAND_DIR, fname)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                report = json.load(f)
+        except (OSError, ValueError):
+            continue
+        age = now - report.get("updated", 0)
+        if age > 12 * DEMAND_HALF_LIFE_SECONDS:
+            os.remove(path)
+            continue
+        for district, score in report.get("scores", {}).items():
+            totals[district] = totals.get(district, 0.0) + _decay(score, age)
+    return totals
+
+def read_queue_state():
+    """Queue state as last written by the refresh leader."""
+    if os.path.exists(STATE_FILE):
+        with open(STATE_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {"leader_pid": None, "queue": []}
+
+# -------------------- SCHEDULER (refresh leader only) --------------------
+def content_hash(data):
+    raw = json.dumps(data, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha1(raw).hexdigest()
+
+class RefreshScheduler:
+    """
+    Keeps one entry per district ordered by when it is next due. The interval
+    shrinks with demand and stretches while the upstream data is unchanged;
+    failed refreshes back off exponentially.
+    """
+
+    def __init__(self, refresh, list_districts, cache_version):
+        self.refresh = refresh              # district -> new cache dict or None
+        self.list_districts = list_districts
+        self.cache_version = cache_version  # district -> mtime_ns of its cache or None
+        self.entries = {}
+
+    def _entry(self, district):
+        if district not in self.entries:
+            version = self.cache_version(district)
+            self.entries[district] = {
+                "district": district,
+                "last_attempt": version / 1e9 if version else 0.0,
+                "last_success": version / 1e9 if version else None,
+                "failures": 0,
+                "unchanged": 0,
+                "jitter": 1.0,
+                "demand": 0.0,
+                "hash": None,
+                "last_error": None,
+            }
+        return self.entries[district]
+
+    def interval(self, entry):
+        demand = max(entry["demand"], 0.01)
+        seconds = BASE_INTERVAL_SECONDS * (REFERENCE_DEMAND / demand) ** 0.5
+        seconds *= UNCHANGED_STRETCH ** min(entry["unchanged"], 4)
+        seconds = min(max(seconds, MIN_INTERVAL_SECONDS), MAX_INTERVAL_SECONDS)
+        return seconds * entry["jitter"]
+
+    def next_due(self, entry):
+        if entry["failures"]:
+            backoff = FAILURE_BACKOFF_SECONDS * 2 ** (entry["failures"] - 1)
+            return entry["last_attempt"] + min(backoff, MAX_BACKOFF_SECONDS) * entry["jitter"]
+        return entry["last_attempt"] + self.interval(entry)
+
+    def sync(self):
+        demand = load_demand()
+        for district in self.list_districts():
+            self._entry(district)["demand"] = demand.get(district, 0.0)
+
+    async def refresh_one(self, entry):
+        district = entry["district"]
+        entry["last_attempt"] = time.time()
+        entry["jitter"] = random.uniform(1 - JITTER, 1 + JITTER)
+        try:
+            data = await asyncio.to_thread(self.refresh, district)
+        except Exception as e:
+            entry["failures"] += 1
+            entry["last_error"] = str(e)
+            print(f"[ERROR] Could not update weekly cache for {district}: {e}")
+            return
+
+        entry["failures"] = 0
+        entry["last_error"] = None
+        if not data:
+            return
+        entry["last_success"] = entry["last_attempt"]
+        new_hash = content_hash(data)
+        entry["unchanged"] = entry["unchanged"] + 1 if new_hash == entry["hash"] else 0
+        entry["hash"] = new_hash
+
+    def queue(self):
+        entries = sorted(self.entries.values(), key=self.next_due)
+        return [
+            {
+                "district": e["district"],
+                "next_due": datetime.fromtimestamp(self.next_due(e)).isoformat(),
+                "interval_seconds": round(self.interval(e)),
+                "demand": round(e["demand"], 2),
+                "failures": e["failures"],
+                "unchanged_refreshes": e["unchanged"],
+                "last_success": datetime.fromtimestamp(e["last_success"]).isoformat() if e["last_success"] else None,
+                "last_error": e["last_error"],
+            }
+            for e in entries
+        ]
+
+    def write_state(self):
+        tmp = f"{STATE_FILE}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"leader_pid": os.getpid(), "updated": datetime.now().isoformat(),
+                       "queue": self.queue()}, f, indent=2)
+        os.replace(tmp, STATE_FILE)
+
+    async def run(self):
+        while True:
+            self.sync()
+            self.write_state()
+            if not self.entries:
+                await asyncio.sleep(RESCAN_SECONDS)
+                continue
+
+            entry = min(self.entries.values(), key=self.next_due)
+            wait = self.next_due(entry) - time.time()
+            if wait > 0:
+                await asyncio.sleep(min(wait, RESCAN_SECONDS))
+                continue
+
+            await self.refresh_one(entry)
@@ -0,0 +1,150 @@
+import os
+import time
+import asyncio
+import hashlib
+import threading
+
+from metrics import Counter, Gauge
+
+# -------------------- CONFIG --------------------
+RELOAD_CHECK_SECONDS = float(os.environ.get("RELOAD_CHECK_SECONDS", "10"))
+
+DATASET_RELOAD_SECONDS = Gauge("dataset_reload_seconds", "Duration of the last dataset rebuild", ("dataset",))
+DATASET_RELOADS = Counter("dataset_reloads_total", "Dataset rebuilds by result", ("dataset", "result"))
+
+# -------------------- SNAPSHOTS --------------------
+class Snapshot:
+    """One immutable version of a dataset: everything build() produced for it."""
+
+    def __init__(self, version, data, signature, build_seconds):
+        self.version = version
+        self.data = data
+        self.signature = signature
+        self.build_seconds = build_seconds
+        self.loaded_at = time.time()
+
+class ReloadableDataset:
+    """
+    A dataset derived from source files. get() hands out the current snapshot;
+    when a source changes, the watcher builds the next snapshot in a thread and
+    swaps it in with a single assignment. Requests that already hold the old
+    snapshot finish on it; later requests see the new one.
+    """
+
+    def __init__(self, name, sources, build):
+        self.name = name
+        self.sources = sources  # list of paths, or a callable returning one
+        self.build = build
+        self.snapshot = None
+        self.lock = threading.Lock()
+        self.pending = None       # changed signature waiting to settle for one check
+        self.failed = None        # signature whose build failed; not retried until it changes
+        self.reloads = 0
+        self.last_error = None
+
+    def signature(self):
+        paths = self.sources() if callable(self.sources) else self.sources
+        signature = []
+        for path in sorted(str(p) for p in paths):
+            try:
+                st = os.stat(path)
+                signature.append((path, st.st_mtime_ns, st.st_size))
+            except FileNotFoundError:
+                signature.append((path, None, None))
+        return tuple(signature)
+
+    def load(self, signature=None):
+        """Build a new snapshot and swap it in; the previous one stays valid for its holders."""
+        with self.lock:
+            signature = signature or self.signature()
+            if self.snapshot is not None and self.snapshot.signature == signature:
+                return self.snapshot
+
+            start = time.perf_counter()
+            try:
+                data = self.build()
+            except Exception as e:
+                self.failed = signature
+                self.last_error = str(e)
+                DATASET_RELOADS.inc(dataset=self.name, result="error")
+                print(f"[ERROR] Could not rebuild dataset {self.name}: {e}")
+                if self.snapshot is None:
+                    raise
+                return self.snapshot
+            seconds = time.perf_counter() - start
+
+            version = hashlib.sha1(repr(signature).encode("utf-8")).hexdigest()[:12]
+            first = self.snapshot is None
+            self.snapshot = Snapshot(version, data, signature, seconds)
+            self.failed = None
+            self.last_error = None
+            DATASET_RELOAD_SECONDS.set(seconds, dataset=self.name)
+            if not first:
+                self.reloads += 1
+                DATASET_RELOADS.inc(dataset=self.name, result="ok")
+            print(f"[INFO] Dataset {self.name} {'loaded' if first else 'reloaded'} as {version} in {seconds:.2f}s")
+            return self.snapshot
+
+    def get(self):
+        snapshot = self.snapshot
+        if snapshot is None:
+            snapshot = self.load()
+        return snapshot.data
+
+    def check(self):
+        """
+        Rebuild when the sources changed and stayed unchanged for one full check
+        interval, so a file that is still being copied is not loaded half-written.
+        """
+        if self.snapshot is None:
+            self.load()
+            return True
+        signature = self.signature()
+        if signature == self.snapshot.signature or signature == self.failed:
+            self.pending = None
+            return False
+        if signature != self.pending:
+            self.pending = signature
+            return False
+        self.pending = None
+        self.load(signature)
+        return True
+
+    def status(self):
+        snapshot = self.snapshot
+        return {
+            "version": snapshot.version if snapshot else None,
+            "loaded_at": snapshot.loaded_at if snapshot else None,
+            "build_seconds": round(snapshot.build_seconds, 3) if snapshot else None,
+            "reloads": self.reloads,
+            "pending": self.pending is not None,
+            "last_error": self.last_error,
+            "sources": [path for path, _, _ in self.signature()],
+        }
+
+# -------------------- REGISTRY --------------------
+_datasets = {}
+
+def register(name, sources, build):
+    dataset = ReloadableDataset(name, sources, build)
+    _datasets[name] = dataset
+    return dataset
+
+def version(name):
+    """Current version of a registered dataset, None until it has loaded."""
+    dataset = _datasets.get(name)
+    snapshot = dataset.snapshot if dataset else None
+    return snapshot.version if snapshot else None
+
+def report():
+    return {"pid": os.getpid(), "datasets": {name: d.status() for name, d in _datasets.items()}}
+
+async def watch():
+    """One task per worker: load every dataset, then rebuild the ones whose sources change."""
+    while True:
+        for name, dataset in list(_datasets.items()):
+            try:
+                await asyncio.to_thread(dataset.check)
+            except Exception as e:
+                print(f"[ERROR] Could not check dataset {name}: {e}")
+        await asyncio.sleep(RELOAD_CHECK_SECONDS)
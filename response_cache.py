@@ -0,0 +1,164 @@
+import os
+import time
+from urllib.parse import parse_qsl, urlencode
+from collections import OrderedDict
+
+import reloader
+from metrics import Counter, match_route
+
+# -------------------- CONFIG --------------------
+RESPONSE_CACHE_ENABLED = os.environ.get("RESPONSE_CACHE", "1") == "1"
+MAX_BYTES = int(os.environ.get("RESPONSE_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))  # per worker
+MAX_ENTRY_BYTES = 2 * 1024 * 1024  # larger bodies (very broad medic queries) are not worth pinning
+
+# route template -> (ttl seconds, datasets whose version invalidates it)
+CACHED_ROUTES = {
+    "/api/crop-summary": (60 * 60, ("ecocrop",)),
+    "/query-crops/": (60 * 60, ("ecocrop",)),
+    "/api/crops/search": (60 * 60, ("crop-facets",)),
+    "/api/medic": (10 * 60, ("pfaf",)),
+    "/api/season-forecast": (60 * 60, ("season-forecasts",)),
+    "/api/autocomplete": (60 * 60, ("autocomplete",)),
+}
+
+CACHE_LOOKUPS = Counter("response_cache_lookups_total", "Response cache lookups by route and result", ("route", "result"))
+
+# -------------------- LRU --------------------
+class ResponseLRU:
+    """Encoded responses bounded by total body size, least recently used evicted first."""
+
+    def __init__(self, max_bytes=MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key -> (expires, versions, status, headers, body)
+        self.size = 0
+        self.stats = {}  # route -> {"hits", "misses", "stores", "evictions"}
+
+    def _count(self, route, field):
+        counts = self.stats.setdefault(route, {"hits": 0, "misses": 0, "stores": 0, "evictions": 0})
+        counts[field] += 1
+
+    def _drop(self, key):
+        entry = self.entries.pop(key)
+        self.size -= len(entry[4])
+
+    def get(self, route, key, versions):
+        entry = self.entries.get(key)
+        if entry is not None and (entry[0] < time.monotonic() or entry[1] != versions):
+            self._drop(key)
+            entry = None
+        if entry is None:
+            self._count(route, "misses")
+            CACHE_LOOKUPS.inc(route=route, result="miss")
+            return None
+        self.entries.move_to_end(key)
+        self._count(route, "hits")
+        CACHE_LOOKUPS.inc(route=route, result="hit")
+        return entry
+
+    def put(self, route, key, ttl, versions, status, headers, body):
+        if key in self.entries:
+            self._drop(key)
+        self.entries[key] = (time.monotonic() + ttl, versions, status, headers, body)
+        self.size += len(body)
+        self._count(route, "stores")
+        while self.size > self.max_bytes and self.entries:
+            oldest = next(iter(self.entries))
+            self._drop(oldest)
+            self._count(oldest[0], "evictions")
+
+    def clear(self):
+        self.entries.clear()
+        self.size = 0
+
+    def report(self):
+        routes = {}
+        for route, counts in self.stats.items():
+            lookups = counts["hits"] + counts["misses"]
+            routes[route] = {**counts, "hit_rate": round(counts["hits"] / lookups, 3) if lookups else None}
+        return {
+            "pid": os.getpid(),
+            "enabled": RESPONSE_CACHE_ENABLED,
+            "entries": len(self.entries),
+            "bytes": self.size,
+            "max_bytes": self.max_bytes,
+            "routes": routes,
+        }
+
+cache = ResponseLRU()
+
+# -------------------- MIDDLEWARE --------------------
+def negotiated_format(scope, query):
+    """json or ndjson, as the routes pick it: an explicit ?format= wins over the Accept header."""
+    explicit = dict(query).get("format")
+    if explicit:
+        return explicit
+    accept = dict(scope.get("headers", [])).get(b"accept", b"").decode("latin-1")
+    return "ndjson" if "application/x-ndjson" in accept else "json"
+
+def cache_key(route, scope):
+    """
+    Route, path, sorted decoded query (so ?a=1&b=2 and ?b=2&a=%31 share an
+    entry) and the response format negotiated from Accept.
+    """
+    query = parse_qsl(scope.get("query_string", b"").decode("latin-1"), keep_blank_values=True)
+    return (route, scope["path"], urlencode(sorted(query)), negotiated_format(scope, query))
+
+def dataset_versions(names):
+    return tuple(reloader.version(name) for name in names)
+
+class ResponseCacheMiddleware:
+    """
+    Serves repeated GETs of deterministic routes from memory. Entries expire
+    after the route's TTL or as soon as a dataset they were built from reloads.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if not RESPONSE_CACHE_ENABLED or scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+
+        route, _ = match_route(scope)
+        if route not in CACHED_ROUTES:
+            await self.app(scope, receive, send)
+            return
+
+        ttl, datasets = CACHED_ROUTES[route]
+        key = cache_key(route, scope)
+        versions = dataset_versions(datasets)
+        entry = cache.get(route, key, versions)
+        if entry is not None:
+            _, _, status, headers, body = entry
+            await send({"type": "http.response.start", "status": status, "headers": headers + [(b"x-cache", b"HIT")]})
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        start = {}
+        chunks = []
+        size = [0]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                # Shared caches must not hand a JSON body to an NDJSON client either
+                message = {**message, "headers": list(message.get("headers", [])) + [(b"vary", b"Accept")]}
+                start.update(message)
+                message = {**message, "headers": message["headers"] + [(b"x-cache", b"MISS")]}
+            elif message["type"] == "http.response.body":
+                # Stop copying once the body is too large to cache, so streamed responses stay unbuffered
+                size[0] += len(message.get("body", b""))
+                if size[0] <= MAX_ENTRY_BYTES:
+                    chunks.append(message.get("body", b""))
+                else:
+                    chunks.clear()
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+        body = b"".join(chunks)
+        # Versions are read again so a reload that landed mid-request is not cached under the old ones;
+        # None means a dataset was still loading when the request started
+        if (start.get("status") == 200 and size[0] <= MAX_ENTRY_BYTES
+                and None not in versions and dataset_versions(datasets) == versions):
+            cache.put(route, key, ttl, versions, 200, list(start.get("headers", [])), body)
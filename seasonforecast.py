@@ -1,37 +1,53 @@
 import os
 
+import reloader
+
 # Base directory where forecast files are stored
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 FORECAST_DIR = os.path.join(BASE_DIR, "metmalawi_forecasts")
 
 
+def forecast_files():
+    return [
+        os.path.join(FORECAST_DIR, f) for f in os.listdir(FORECAST_DIR) if f.lower().endswith(".txt")
+    ]
+
+
+def read_forecasts():
+    """District file stem (ZOMBA) -> forecast text, for every seasonal forecast file."""
+    forecasts = {}
+    for path in forecast_files():
+        with open(path, "r", encoding="utf-8") as file:
+            forecasts[os.path.basename(path)[:-4].upper()] = file.read()
+    return forecasts
+
+
+# Rebuilt in the background when a forecast file is edited, added or removed
+forecasts = reloader.register("season-forecasts", forecast_files, read_forecasts)
+
+
 def get_season_forecast(district: str) -> dict:
     """
     Read and return the full seasonal forecast for a district
     """
 
     # Normalize district name (Zomba → ZOMBA.txt)
-    filename = f"{district.upper()}.txt"
-    file_path = os.path.join(FORECAST_DIR, filename)
-
-    if not os.path.exists(file_path):
-        return {
-            "status": "error",
-            "message": f"Seasonal forecast for '{district}' not found"
-        }
-
     try:
-        with open(file_path, "r", encoding="utf-8") as file:
-            content = file.read()
-
+        content = forecasts.get().get(district.upper())
+    except Exception as e:
         return {
-            "status": "success",
-            "district": district.title(),
-            "forecast": content
+            "status": "error",
+            "message": str(e)
         }
 
-    except Exception as e:
+    if content is None:
         return {
             "status": "error",
-            "message": str(e)
+            "message": f"Seasonal forecast for '{district}' not found"
         }
+
+    return {
+        "status": "success",
+        "district": district.title(),
+        "forecast": content
+    }
@@ -0,0 +1,151 @@
+import os
+import re
+import time
+import fcntl
+import hashlib
+import pandas as pd
+
+from metrics import DATASET_LOAD_SECONDS
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+except ImportError:  # shared mapping is optional, fall back to per-process frames
+    pa = None
+
+# -------------------- CONFIG --------------------
+SHARED_DIR = os.environ.get("SHARED_DATA_DIR", "cache/shared")
+LAYOUT_VERSION = "1"  # bump when a build function changes the stored columns
+
+os.makedirs(SHARED_DIR, exist_ok=True)
+
+if pa is not None:
+    # Pay pyarrow's lazy pandas setup now so it isn't counted against a dataset
+    pa.table({"_": [0]}).to_pandas(types_mapper=pd.ArrowDtype)
+
+_attached = {}
+_reports = {}
+
+# -------------------- MEMORY HELPERS --------------------
+def private_rss():
+    """Anonymous (per-process) resident memory in bytes, 0 when unavailable."""
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("RssAnon:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+def _mb(n):
+    return f"{n / (1024 * 1024):.1f} MB"
+
+# -------------------- SNAPSHOT FILES --------------------
+def snapshot_key(name: str, source):
+    st = os.stat(source)
+    raw = f"{name}:{os.path.abspath(source)}:{st.st_mtime_ns}:{st.st_size}:{LAYOUT_VERSION}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+def snapshot_path(name: str, source):
+    return os.path.join(SHARED_DIR, f"{name}-{snapshot_key(name, source)}.arrow")
+
+def _dataset_of(path: str):
+    """'cache/shared/ecocrop-names-0123456789abcdef.arrow' -> 'ecocrop-names'; None for other files."""
+    match = re.fullmatch(r"(.+)-[0-9a-f]{16}\.arrow", os.path.basename(path))
+    return match.group(1) if match else None
+
+def _publish(name: str, path: str, df):
+    """Write df as an Arrow IPC file that other workers can memory-map."""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    heap_bytes = int(df.memory_usage(deep=True).sum())
+    table = table.replace_schema_metadata({
+        **(table.schema.metadata or {}),
+        b"heap_bytes": str(heap_bytes).encode(),
+    })
+
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with pa.OSFile(tmp, "wb") as sink:
+        with ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp, path)
+
+    # Old snapshots of the same dataset are no longer needed; workers that
+    # still map them keep their pages until they let go.
+    for fname in os.listdir(SHARED_DIR):
+        full = os.path.join(SHARED_DIR, fname)
+        if _dataset_of(fname) == name and full != path:
+            try:
+                os.remove(full)
+            except OSError:
+                pass
+
+def _map(path: str):
+    source = pa.memory_map(path, "r")
+    table = ipc.open_file(source).read_all()
+    heap_bytes = int((table.schema.metadata or {}).get(b"heap_bytes", b"0"))
+    # ArrowDtype keeps the columns as views over the mapped buffers (no copy)
+    return table.to_pandas(types_mapper=pd.ArrowDtype), heap_bytes
+
+# -------------------- PUBLIC API --------------------
+def attach(name: str, source, build):
+    """
+    Return the read-only frame `name` derived from the `source` file.
+
+    The first worker to get here runs build() and publishes the result under
+    SHARED_DIR; every worker then maps the same file, so the column buffers are
+    shared page cache instead of a private copy per process.
+    """
+    start = time.perf_counter()
+    source = str(source)
+    path = snapshot_path(name, source) if pa is not None and os.path.exists(source) else None
+    if path is None:
+        df = build()
+        DATASET_LOAD_SECONDS.set(time.perf_counter() - start, dataset=name)
+        return df
+
+    if path in _attached:
+        return _attached[path]
+
+    if not os.path.exists(path):
+        with open(os.path.join(SHARED_DIR, f"{name}.lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                if not os.path.exists(path):
+                    df = build()
+                    if df is None:
+                        return None
+                    _publish(name, path, df)
+                    print(f"[INFO] Published shared dataset {name} -> {path}")
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    before = private_rss()
+    df, heap_bytes = _map(path)
+    private_bytes = max(0, private_rss() - before)
+
+    # A reload maps the new snapshot; forget older versions so they are freed
+    # once the requests still holding them finish
+    for old in [p for p in _attached if _dataset_of(p) == name]:
+        del _attached[old]
+    _attached[path] = df
+    DATASET_LOAD_SECONDS.set(time.perf_counter() - start, dataset=name)
+    _reports[name] = {
+        "path": path,
+        "rows": len(df),
+        "heap_bytes": heap_bytes,
+        "private_bytes": private_bytes,
+        "rss_saved_bytes": max(0, heap_bytes - private_bytes),
+    }
+    print(f"[INFO] Attached shared dataset {name} in pid {os.getpid()}: "
+          f"{_mb(private_bytes)} private, {_mb(_reports[name]['rss_saved_bytes'])} RSS saved")
+    return df
+
+def memory_report():
+    return {
+        "pid": os.getpid(),
+        "shared": pa is not None,
+        "private_rss_bytes": private_rss(),
+        "rss_saved_bytes": sum(r["rss_saved_bytes"] for r in _reports.values()),
+        "datasets": _reports,
+    }
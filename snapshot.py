@@ -0,0 +1,182 @@
+"""
+Export and import everything a new instance needs to serve warm.
+
+    python snapshot.py export [archive]   # default cache/snapshot.tar.gz
+    python snapshot.py import [archive]
+
+The archive holds every stored forecast with its version, the district
+registry and the precomputed deltas. Importing never replaces a forecast
+with an older one, so it is safe on an instance that already has data,
+and from several workers at once. Set SNAPSHOT_IMPORT to an archive path
+to import it at startup.
+"""
+import io
+import os
+import re
+import sys
+import zlib
+import json
+import gzip
+import time
+import tarfile
+from datetime import datetime
+
+import alerts
+import districts as district_table
+import forecast_deltas
+from forecast_store import store
+from weekly_cache import load_districts, save_districts
+
+# -------------------- CONFIG --------------------
+SNAPSHOT_FILE = os.environ.get("SNAPSHOT_FILE", "cache/snapshot.tar.gz")
+SNAPSHOT_IMPORT = os.environ.get("SNAPSHOT_IMPORT")  # archive imported by every worker at startup
+FORMAT_VERSION = 1
+
+DISTRICT_NAME = re.compile(r"[a-z0-9][a-z0-9 _-]*")
+
+# -------------------- EXPORT --------------------
+def _add(tar, name, data: bytes, mtime):
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    info.mtime = mtime
+    tar.addfile(info, io.BytesIO(data))
+
+def export_snapshot():
+    """The gzipped tar archive as bytes."""
+    forecasts = store.dump()
+    now = time.time()
+    manifest = {
+        "format": FORMAT_VERSION,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "forecasts": {district: version for district, version, _ in forecasts},
+        "districts": load_districts(),
+    }
+
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as tar:
+        _add(tar, "manifest.json", json.dumps(manifest, indent=2).encode("utf-8"), now)
+        for district, version, body in forecasts:
+            _add(tar, f"forecasts/{district}.json", body, version / 1e9)
+            for kind, document in forecast_deltas.export_district(district).items():
+                raw = json.dumps(document, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+                _add(tar, f"deltas/{district}_{kind}.json", raw, now)
+    return buffer.getvalue()
+
+def write_snapshot(path=SNAPSHOT_FILE):
+    data = export_snapshot()
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+    return len(data)
+
+# -------------------- IMPORT --------------------
+def _member(tar, name):
+    try:
+        member = tar.extractfile(name)
+    except KeyError:
+        return None
+    return member.read() if member is not None else None  # None for directories and links
+
+def check_manifest(manifest):
+    """Raise ValueError unless the manifest has the shape export_snapshot writes."""
+    if not isinstance(manifest, dict):
+        raise ValueError("Snapshot manifest is not a JSON object")
+    if manifest.get("format") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported snapshot format {manifest.get('format')!r}")
+    forecasts = manifest.get("forecasts")
+    if not isinstance(forecasts, dict):
+        raise ValueError("Snapshot manifest has no forecasts table")
+    for district, version in forecasts.items():
+        # bool is an int subclass, but never a version; versions are ns timestamps stored as SQLite INTEGER
+        if not DISTRICT_NAME.fullmatch(district) or type(version) is not int or not 0 < version < 2 ** 63:
+            raise ValueError(f"Snapshot entry for {district!r} is invalid")
+    districts = manifest.get("districts", [])
+    if not isinstance(districts, list) or not all(isinstance(d, str) for d in districts):
+        raise ValueError("Snapshot district registry is not a list of names")
+
+def import_snapshot(data: bytes):
+    """
+    Load an archive made by export_snapshot. Members are read by name, never
+    extracted, so a crafted archive cannot write outside the cache. Anything
+    wrong with the archive raises ValueError.
+    """
+    start = time.perf_counter()
+    pending, skipped, unknown = [], [], []
+    try:
+        with tarfile.open(fileobj=io.BytesIO(data), mode="r:gz") as tar:
+            manifest = json.loads(_member(tar, "manifest.json") or b"{}")
+            check_manifest(manifest)
+
+            # Everything is read and checked before anything is written, so a bad member changes nothing
+            for district, version in manifest["forecasts"].items():
+                if district_table.resolve(district) != district:
+                    unknown.append(district)  # only bundled districts are served and refreshed
+                    continue
+                current = store.version(district)
+                if current is not None and current >= version:
+                    skipped.append(district)  # this or a newer forecast is already stored
+                    continue
+                body = _member(tar, f"forecasts/{district}.json")
+                if body is None or not isinstance(json.loads(body), dict):
+                    raise ValueError(f"Snapshot forecast for {district!r} is missing or not a JSON object")
+                # Deltas belong to the forecast version they were computed for
+                documents = {}
+                for kind in forecast_deltas.DELTA_KINDS:
+                    raw = _member(tar, f"deltas/{district}_{kind}.json")
+                    if raw is not None:
+                        documents[kind] = json.loads(raw)
+                pending.append((district, version, body, documents))
+    except (EOFError, zlib.error, gzip.BadGzipFile, tarfile.TarError) as e:
+        raise ValueError(f"Snapshot archive is truncated or corrupt: {e}") from e
+
+    imported = []
+    for district, version, body, documents in pending:
+        store.write(district, body, version)
+        forecast_deltas.import_district(district, documents)
+        imported.append(district)
+
+    known = load_districts()
+    resolved = [district_table.resolve(d) for d in manifest.get("districts", [])]
+    added = [d for d in dict.fromkeys(resolved) if d is not None and d not in known]
+    if added:
+        save_districts(known + added)
+    if imported:
+        alerts.rebuild()
+
+    seconds = time.perf_counter() - start
+    print(f"[INFO] Snapshot imported in {seconds:.2f}s: {len(imported)} forecast(s) loaded, "
+          f"{len(skipped)} already newer, {len(unknown)} unknown, {len(added)} district(s) registered")
+    return {
+        "created_at": manifest.get("created_at"),
+        "imported": imported,
+        "skipped": skipped,
+        "unknown": unknown,
+        "districts_added": added,
+        "seconds": round(seconds, 3),
+    }
+
+def import_file(path):
+    with open(path, "rb") as f:
+        return import_snapshot(f.read())
+
+def import_at_startup():
+    """Import SNAPSHOT_IMPORT if set; a missing or broken archive only costs a cold start."""
+    if not SNAPSHOT_IMPORT:
+        return None
+    try:
+        return import_file(SNAPSHOT_IMPORT)
+    except (OSError, ValueError, EOFError, zlib.error, tarfile.TarError) as e:
+        print(f"[ERROR] Could not import snapshot {SNAPSHOT_IMPORT}: {e}")
+        return None
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in ("export", "import"):
+        print(__doc__)
+        sys.exit(1)
+    path = sys.argv[2] if len(sys.argv) > 2 else SNAPSHOT_FILE
+    if sys.argv[1] == "export":
+        size = write_snapshot(path)
+        print(f"[INFO] Snapshot of {len(store.districts())} forecast(s) written to {path} ({size} bytes)")
+    else:
+        import_file(path)
@@ -0,0 +1,130 @@
+import time
+import random
+import threading
+import requests
+
+from metrics import Counter, Gauge
+
+# -------------------- CONFIG --------------------
+REQUEST_BUDGET_SECONDS = 8.0    # total time one scrape may spend on metmalawi, retries included
+ATTEMPT_TIMEOUT_SECONDS = 5.0
+MAX_ATTEMPTS = 3
+BACKOFF_SECONDS = 0.5           # doubled after every failed attempt, with jitter
+FAILURE_THRESHOLD = 5           # consecutive failures that open the circuit
+RESET_SECONDS = 30              # first open period; doubles on every failed probe
+MAX_RESET_SECONDS = 10 * 60
+
+UPSTREAM_FAILURES = Counter("upstream_failures_total", "Failed metmalawi requests", ("reason",))
+CIRCUIT_STATE = Gauge("upstream_circuit_state", "metmalawi circuit: 0 closed, 1 half-open, 2 open")
+
+class UpstreamUnavailable(Exception):
+    """metmalawi is failing or the circuit is open; callers should fall back to cache."""
+
+# -------------------- CIRCUIT BREAKER --------------------
+class CircuitBreaker:
+    STATES = {"closed": 0, "half_open": 1, "open": 2}
+
+    def __init__(self, failure_threshold=FAILURE_THRESHOLD, reset_seconds=RESET_SECONDS,
+                 max_reset_seconds=MAX_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.max_reset_seconds = max_reset_seconds
+        self.lock = threading.Lock()
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = None
+        self.open_for = reset_seconds
+        self.probing = False
+        self.trips = 0
+        self.last_error = None
+
+    def _set_state(self, state):
+        self.state = state
+        CIRCUIT_STATE.set(self.STATES[state])
+
+    def allow(self):
+        """True if a request may go out now; half-open lets exactly one probe through."""
+        with self.lock:
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.open_for:
+                self._set_state("half_open")
+                self.probing = False
+            if self.state == "closed":
+                return True
+            if self.state == "half_open" and not self.probing:
+                self.probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.open_for = self.reset_seconds
+            self.probing = False
+            self._set_state("closed")
+
+    def record_failure(self, error):
+        with self.lock:
+            self.failures += 1
+            self.last_error = str(error)
+            if self.state == "half_open":
+                self.open_for = min(self.open_for * 2, self.max_reset_seconds)
+            elif self.failures < self.failure_threshold:
+                return
+            self.opened_at = time.monotonic()
+            self.probing = False
+            self.trips += 1
+            self._set_state("open")
+
+    def retry_after(self):
+        with self.lock:
+            if self.state != "open":
+                return 0.0
+            return max(0.0, self.open_for - (time.monotonic() - self.opened_at))
+
+    def snapshot(self):
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "trips": self.trips,
+            "retry_after_seconds": round(self.retry_after(), 1),
+            "last_error": self.last_error,
+        }
+
+breaker = CircuitBreaker()
+
+# -------------------- FETCH --------------------
+def fetch(url: str, budget: float = REQUEST_BUDGET_SECONDS):
+    """
+    GET a metmalawi page through the shared breaker, retrying with exponential
+    backoff while the latency budget allows. 4xx answers are returned to the
+    caller (bad district), 5xx and network errors count as upstream failures.
+    """
+    deadline = time.monotonic() + budget
+    attempt = 0
+    while True:
+        if not breaker.allow():
+            raise UpstreamUnavailable(f"metmalawi circuit open, retry in {breaker.retry_after():.0f}s")
+
+        remaining = deadline - time.monotonic()
+        try:
+            response = requests.get(url, timeout=min(ATTEMPT_TIMEOUT_SECONDS, remaining))
+        except requests.RequestException as e:
+            error, reason = e, type(e).__name__
+        except Exception as e:
+            # Not retried, but still a failed attempt: a half-open probe must not stay taken forever
+            breaker.record_failure(e)
+            UPSTREAM_FAILURES.inc(reason=type(e).__name__)
+            raise
+        else:
+            if response.status_code < 500:
+                breaker.record_success()
+                return response
+            error, reason = f"HTTP {response.status_code}", "http_5xx"
+
+        breaker.record_failure(error)
+        UPSTREAM_FAILURES.inc(reason=reason)
+        attempt += 1
+        delay = BACKOFF_SECONDS * 2 ** (attempt - 1) * random.uniform(0.5, 1.0)
+        if attempt >= MAX_ATTEMPTS or time.monotonic() + delay + 0.5 >= deadline:
+            raise UpstreamUnavailable(f"metmalawi request failed after {attempt} attempt(s): {error}")
+        time.sleep(delay)
@@ -1,17 +1,28 @@
 import os
 import json
+import threading
+import time
 from weekly_scraper import get_weekly_forecast  # your existing scraper
+from refresh_scheduler import RefreshScheduler, track_registry
 from datetime import datetime
-import asyncio
+from metrics import CACHE_LOOKUPS
+import forecast_history
+import forecast_deltas
+from forecast_store import store, encode
+import alerts
+import districts as district_table
 
 # -------------------- CONFIG --------------------
-CACHE_DIR = "cache/weekly_cache"
 DISTRICTS_FILE = "cache/districts.json"
-UPDATE_INTERVAL_SECONDS = 60 * 60  # 1 hour
+STALE_AFTER_SECONDS = 2 * 60 * 60  # cache hits older than this are counted as stale
+NEGATIVE_CACHE_SECONDS = 60  # failed scrapes are not retried for this long
 
-os.makedirs(CACHE_DIR, exist_ok=True)
 os.makedirs(os.path.dirname(DISTRICTS_FILE), exist_ok=True)
 
+_memory_cache = {}  # district -> (cache version, data)
+_failed_until = {}  # district -> time until which a failed scrape isn't retried
+_bytes_cache = {}   # district -> (cache version, compact JSON bytes)
+
 # -------------------- DISTRICTS HANDLING --------------------
 def load_districts():
     if os.path.exists(DISTRICTS_FILE):
@@ -20,24 +31,56 @@ def load_districts():
     return []
 
 def save_districts(districts):
-    with open(DISTRICTS_FILE, "w", encoding="utf-8") as f:
+    tmp = f"{DISTRICTS_FILE}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
         json.dump(districts, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, DISTRICTS_FILE)
 
 # -------------------- CACHE HANDLING --------------------
-def cache_file_path(district: str):
-    return os.path.join(CACHE_DIR, f"{district.lower()}_weekly.json")
+def cache_version(district: str):
+    """Version of the cached forecast (its write time in ns); None when nothing is cached."""
+    return store.version(district)
 
 def load_cache(district: str):
-    path = cache_file_path(district)
-    if os.path.exists(path):
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return None
+    # Workers re-read a district from the store when its version changes
+    # and serve it from memory otherwise.
+    key = district.lower()
+    version = cache_version(key)
+    if version is None:
+        return None
+    hit = _memory_cache.get(key)
+    if hit and hit[0] == version:
+        return hit[1]
+    stored = store.read(key)
+    if stored is None:
+        return None
+    version, raw = stored
+    data = json.loads(raw)
+    _memory_cache[key] = (version, data)
+    return data
+
+def load_cache_bytes(district: str):
+    """Compact UTF-8 JSON of a district's cache, exactly as stored."""
+    key = district.lower()
+    version = cache_version(key)
+    if version is None:
+        return None
+    hit = _bytes_cache.get(key)
+    if hit and hit[0] == version:
+        return hit[1]
+    stored = store.read(key)
+    if stored is None:
+        return None
+    _bytes_cache[key] = stored
+    return stored[1]
 
 def save_cache(district: str, data: dict):
-    path = cache_file_path(district)
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    # One atomic write to the forecast store; readers see the old or the new forecast
+    forecast_deltas.record(district, data)
+    store.write(district, encode(data))
+    forecast_history.safe_append(district, data)
+    # Scheduled refreshes, prewarm and on-demand scrapes all land here; a burst of them costs one rebuild
+    alerts.schedule_rebuild()
 
 def clean_old_days(forecast_data):
     """Remove past days so the cache always starts from today."""
@@ -48,7 +91,7 @@ def clean_old_days(forecast_data):
         if not table_date_str:
             continue
         try:
-            table_date = datetime.strptime(table_date_str, "%A %d %B").replace(year=today.year).date()
+            table_date = forecast_history.valid_time(table_date_str, "00:00", datetime.now()).date()
         except:
             continue
         if table_date >= today:
@@ -57,27 +100,31 @@ def clean_old_days(forecast_data):
     return forecast_data
 
 # -------------------- BACKGROUND TASK --------------------
+def refresh_district(district: str):
+    """Scrape and save one district. Returns the new cache, or None if the scraper had no data."""
+    forecast = get_weekly_forecast(district)
+    if isinstance(forecast, dict):
+        raise RuntimeError(forecast.get("error", "unexpected scraper response"))
+    if not forecast:
+        return None  # skip if scraper returns no data
+
+    json_data = {
+        "district": district.title(),
+        "data": forecast
+    }
+    json_data = clean_old_days(json_data)
+    save_cache(district, json_data)
+    print(f"[INFO] Weekly cache updated for {district} at {datetime.now()}")
+    return json_data
+
+scheduler = RefreshScheduler(refresh_district, load_districts, cache_version)
+
+track_registry(load_districts)
+
 async def auto_refresh():
-    """Periodically refresh all cached districts."""
-    while True:
-        districts = load_districts()
-        for district in districts:
-            try:
-                forecast = get_weekly_forecast(district)
-                if not forecast:
-                    continue  # skip if scraper returns no data
-
-                json_data = {
-                    "district": district.title(),
-                    "data": forecast
-                }
-                json_data = clean_old_days(json_data)
-                save_cache(district, json_data)
-                print(f"[INFO] Weekly cache updated for {district} at {datetime.now()}")
-            except Exception as e:
-                print(f"[ERROR] Could not update weekly cache for {district}: {e}")
-
-        await asyncio.sleep(UPDATE_INTERVAL_SECONDS)
+    """Keep cached districts fresh, most requested first (see refresh_scheduler)."""
+    alerts.schedule_rebuild()  # caches may have changed while no leader was running
+    await scheduler.run()
 
 # -------------------- DYNAMIC FETCH FUNCTION --------------------
 def fetch_weekly_forecast(district: str):
@@ -87,17 +134,29 @@ def fetch_weekly_forecast(district: str):
     - If not cached, try scraping. If successful, save cache & add district to JSON
     - If no data, return empty
     """
-    district_key = district.lower()
+    district_key = district_table.resolve(district) or district.lower()
     cache = load_cache(district_key)
     if cache:
+        stale = time.time() - cache_version(district_key) / 1e9 > STALE_AFTER_SECONDS
+        CACHE_LOOKUPS.inc(cache="weekly", result="stale" if stale else "hit")
         return cache
+    CACHE_LOOKUPS.inc(cache="weekly", result="miss")
+
+    # Names outside the bundled district table are never scraped
+    if district_table.resolve(district_key) is None:
+        return {"district": district.title(), "data": []}
+
+    # A district that just failed isn't scraped again until the negative entry expires
+    if _failed_until.get(district_key, 0) > time.time():
+        return {"district": district.title(), "data": []}
 
     try:
         forecast = get_weekly_forecast(district_key)
     except Exception:
         forecast = []
 
-    if not forecast:
+    if not forecast or isinstance(forecast, dict):
+        _failed_until[district_key] = time.time() + NEGATIVE_CACHE_SECONDS
         return {"district": district.title(), "data": []}
 
     json_data = {